@@ -0,0 +1,138 @@
+"""
+اثر ایندکس‌های تعریف‌شده در booking/models.py روی کوئری‌های پرتکرار.
+
+یک دیتابیس SQLite موقت با تعداد زیادی رزرو ساخته می‌شود، سپس برای هر کوئری
+طرح اجرا (EXPLAIN QUERY PLAN) و زمان اجرا بدون ایندکس و با ایندکس چاپ می‌شود.
+
+اجرا از ریشه پروژه:
+    python -m benchmarks.bench_indexes [تعداد رزروها، پیش‌فرض 1000000]
+"""
+from datetime import date, timedelta
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.schema import CreateTable
+
+from booking.database import Base
+from booking import models  # noqa: F401  ثبت مدل‌ها در metadata
+
+USERS = 20_000
+HOTELS = 2_000
+REPEAT = 200
+BUDGET_SECONDS = 5
+
+QUERIES = {
+    "user bookings page": (
+        "SELECT * FROM bookings WHERE user_id = :user_id ORDER BY id LIMIT 101",
+        lambda: {"user_id": random.randint(1, USERS)},
+    ),
+    "overlap check": (
+        "SELECT 1 FROM bookings WHERE hotel_id = :hotel_id AND check_in_date < :check_out "
+        "AND check_out_date > :check_in AND status != 'Cancelled' LIMIT 1",
+        lambda: _window({"hotel_id": random.randint(1, HOTELS)}),
+    ),
+    "manager bookings page": (
+        "SELECT bookings.* FROM bookings JOIN hotels ON hotels.id = bookings.hotel_id "
+        "WHERE hotels.user_id = :user_id ORDER BY bookings.id LIMIT 101",
+        lambda: {"user_id": random.randint(1, USERS)},
+    ),
+    "available hotels (anti-join)": (
+        "SELECT hotels.id FROM hotels WHERE hotels.price_per_night <= :max_price AND NOT EXISTS ("
+        "SELECT 1 FROM bookings WHERE bookings.hotel_id = hotels.id AND bookings.check_in_date < :check_out "
+        "AND bookings.check_out_date > :check_in AND bookings.status != 'Cancelled')",
+        lambda: _window({"max_price": 80}),
+    ),
+}
+
+
+def _window(params: dict) -> dict:
+    start = date(2026, 1, 1) + timedelta(days=random.randint(0, 700))
+    params.update(check_in=start.isoformat(), check_out=(start + timedelta(days=3)).isoformat())
+    return params
+
+
+def populate(conn, bookings: int):
+    conn.execute(
+        text("INSERT INTO users (id, name, lastname, email, password, role) VALUES (:id, 'n', 'l', :email, 'x', :role)"),
+        [{"id": i, "email": "u%d@example.com" % i, "role": "hotel_manager" if i % 10 == 0 else "user"}
+         for i in range(1, USERS + 1)],
+    )
+    conn.execute(
+        text("INSERT INTO hotels (id, name, location, has_wifi, price_per_night, user_id) "
+             "VALUES (:id, 'h', 'l', 1, :price, :user_id)"),
+        [{"id": i, "price": random.uniform(20, 300), "user_id": random.randint(1, USERS // 10) * 10}
+         for i in range(1, HOTELS + 1)],
+    )
+    statuses = ("Pending", "Confirmed", "Cancelled")
+    base = date(2024, 1, 1)
+    batch = []
+    for i in range(1, bookings + 1):
+        check_in = base + timedelta(days=random.randint(0, 1100))
+        batch.append({
+            "user_id": random.randint(1, USERS),
+            "hotel_id": random.randint(1, HOTELS),
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=random.randint(1, 7))).isoformat(),
+            "status": random.choice(statuses),
+        })
+        if len(batch) == 50_000 or i == bookings:
+            conn.execute(
+                text("INSERT INTO bookings (user_id, hotel_id, check_in_date, check_out_date, status) "
+                     "VALUES (:user_id, :hotel_id, :check_in, :check_out, :status)"),
+                batch,
+            )
+            batch = []
+
+
+def run_queries(conn, label: str):
+    print("\n== %s ==" % label)
+    for name, (sql, params) in QUERIES.items():
+        plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params()).fetchall()
+        # هر کوئری تا REPEAT بار یا حداکثر BUDGET_SECONDS ثانیه اجرا می‌شود
+        runs = 0
+        start = time.perf_counter()
+        while runs < REPEAT and time.perf_counter() - start < BUDGET_SECONDS:
+            conn.execute(text(sql), params()).fetchall()
+            runs += 1
+        elapsed_ms = (time.perf_counter() - start) / runs * 1000
+        print("%-30s %9.3f ms/query (%d runs)" % (name, elapsed_ms, runs))
+        for row in plan:
+            print("    " + row[-1])
+
+
+def main():
+    bookings = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine("sqlite:///" + os.path.join(tmp, "bench.db"))
+        with engine.begin() as conn:
+            # فقط جدول‌ها ساخته می‌شوند؛ ایندکس‌ها بعداً اضافه می‌شوند
+            for table in Base.metadata.sorted_tables:
+                conn.execute(CreateTable(table))
+            start = time.perf_counter()
+            populate(conn, bookings)
+            print("inserted %d bookings in %.1fs" % (bookings, time.perf_counter() - start))
+            conn.execute(text("ANALYZE"))
+
+        with engine.connect() as conn:
+            run_queries(conn, "without secondary indexes")
+
+        with engine.begin() as conn:
+            start = time.perf_counter()
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(conn)
+            conn.execute(text("ANALYZE"))
+            print("\ncreated indexes in %.1fs" % (time.perf_counter() - start))
+
+        with engine.connect() as conn:
+            run_queries(conn, "with model indexes")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+مقایسه هزینه تایید توکن با jwt.decode مستقیم و با decode_access_token (کش‌شده).
+
+اجرا از ریشه پروژه:
+    python -m benchmarks.bench_token_cache
+"""
+import time
+import timeit
+
+import jwt
+
+from booking.auth import ALGORITHM, SECRET_KEY, create_access_token, decode_access_token, token_cache
+
+TARGET_RPS = 10_000
+ROUNDS = 50_000
+
+
+def bench(label: str, fn):
+    seconds = min(timeit.repeat(fn, number=ROUNDS, repeat=3))
+    per_call_us = seconds / ROUNDS * 1e6
+    # درصد یک هسته CPU که فقط برای تایید توکن در 10k req/s مصرف می‌شود
+    core_share = per_call_us * TARGET_RPS / 1e6 * 100
+    print(f"{label:<24} {per_call_us:8.2f} us/op   {core_share:6.1f}% of one core at {TARGET_RPS} req/s")
+    return per_call_us
+
+
+def main():
+    token = create_access_token({"sub": 1})
+    token_cache.clear()
+    baseline = bench("jwt.decode", lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]))
+    decode_access_token(token)
+    cached = bench("decode_access_token", lambda: decode_access_token(token))
+    print(f"speedup: {baseline / cached:.1f}x  cache: {token_cache.stats()}")
+
+    # توکن‌های متفاوت برای اندازه‌گیری هزینه miss
+    tokens = [create_access_token({"sub": i}) for i in range(ROUNDS)]
+    token_cache.clear()
+    start = time.perf_counter()
+    for t in tokens:
+        decode_access_token(t)
+    print(f"{'cold (all misses)':<24} {(time.perf_counter() - start) / ROUNDS * 1e6:8.2f} us/op")
+
+
+if __name__ == "__main__":
+    main()
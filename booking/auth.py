@@ -1,10 +1,14 @@
 import jwt
+import hashlib
+import time
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from booking.models import User
 from booking.database import get_db
+from booking.cache import TTLCache
+from booking.hashing import check_password, hash_password
+from booking.config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
 from sqlalchemy.orm import Session
 import secrets  # برای تولید کلید تصادفی
 
@@ -13,18 +17,32 @@ SECRET_KEY = secrets.token_hex(32)  # استفاده از یک کلید تصاد
 ALGORITHM = "HS256"  # الگوریتم رمزنگاری برای JWT
 ACCESS_TOKEN_EXPIRE_MINUTES = 30  # مدت زمان اعتبار توکن در دقیقه
 
-# تنظیم رمزگذاری پسورد
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/tokens")
 
+# نسخه فشرده کاربر که در کش نگهداری می‌شود
+class Principal:
+    __slots__ = ("id", "role", "email")
+
+    def __init__(self, id: int, role: str, email: str):
+        self.id = id
+        self.role = role
+        self.email = email
+
+# کش کاربران براساس شناسه؛ با تغییر یا حذف کاربر باطل می‌شود
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
+# کش claimهای توکن‌های تایید‌شده تا زمان انقضای هر توکن
+token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
 # توابع کمکی برای هش و تایید پسورد
+# هش bcrypt در استخر پروسه‌های booking.hashing اجرا می‌شود
 def get_password_hash(password: str) -> str:
     """هش پسورد را برمی‌گرداند."""
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """تایید می‌کند که پسورد ورودی با پسورد هش شده برابر است."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return check_password(plain_password, hashed_password)
 
 # ایجاد توکن JWT
 def create_access_token(data: dict) -> str:
@@ -35,15 +53,35 @@ def create_access_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# تایید و دیکد توکن JWT با استفاده از کش
+def decode_access_token(token: str) -> dict:
+    """
+    توکن را تایید و دیکد می‌کند.
+    claimها با کلید هش SHA-256 توکن تا زمان exp کش می‌شوند تا درخواست‌های
+    تکراری با همان توکن دوباره HMAC و JSON را پردازش نکنند.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = exp - time.time()
+        if ttl > 0:
+            token_cache.set(key, payload, ttl)
+    return payload
+
 # وابستگی برای دریافت کاربر فعلی براساس توکن
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
     """
     کاربر فعلی را براساس توکن دریافتی بازیابی می‌کند.
     اگر توکن معتبر نباشد یا کاربر وجود نداشته باشد، خطا ایجاد می‌کند.
+    نتیجه در principal_cache نگهداری می‌شود تا هر درخواست یک SELECT اضافه نداشته باشد.
     """
     try:
         # توکن را دیکد می‌کند و اطلاعات آن را دریافت می‌کند
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         user_id: int = payload.get("sub")  # شناسه کاربر را از توکن دریافت می‌کند
         if user_id is None:
             raise HTTPException(
@@ -51,14 +89,22 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
                 detail="Invalid credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        user = db.query(User).filter(User.id == user_id).first()
+        principal = principal_cache.get(user_id)
+        if principal is not None:
+            return principal
+        user = db.query(User.id, User.role, User.email).filter(User.id == user_id).first()
+        # session این وابستگی ممکن است با session نوشتنی مسیر یکی نباشد؛ تراکنش خواندن همین‌جا
+        # بسته می‌شود تا در حالت غیر WAL قفل SHARED آن commit نوشتن همان درخواست را معطل نکند
+        db.rollback()
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return user
+        principal = Principal(user.id, user.role, user.email)
+        principal_cache.set(user_id, principal)
+        return principal
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,171 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+import threading
+import time
+
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+
+from booking.config import AVAILABILITY_INDEX, AVAILABILITY_INDEX_TTL
+from booking.models import Booking, Hotel
+
+# وضعیتی که در بررسی هم‌پوشانی رزروها نادیده گرفته می‌شود
+CANCELLED = "Cancelled"
+
+
+def overlap_filter(hotel_id, check_in_date: date, check_out_date: date):
+    """شرط‌های SQL برای یافتن رزروهای فعال هم‌پوشان با یک بازه را برمی‌گرداند."""
+    return (
+        Booking.hotel_id == hotel_id,
+        Booking.check_in_date < check_out_date,
+        Booking.check_out_date > check_in_date,
+        Booking.status != CANCELLED,
+    )
+
+
+def hotel_is_free(check_in_date: date, check_out_date: date):
+    """شرط anti-join برای هتل‌هایی که در بازه داده‌شده رزرو فعال ندارند."""
+    return ~exists().where(*overlap_filter(Hotel.id, check_in_date, check_out_date))
+
+
+def available_hotels_query(db: Session, check_in_date: date, check_out_date: date):
+    """
+    هتل‌هایی که در بازه داده‌شده رزرو فعال ندارند را با یک anti-join برمی‌گرداند.
+    """
+    return db.query(Hotel).filter(hotel_is_free(check_in_date, check_out_date))
+
+
+class HotelIntervalIndex:
+    """
+    ایندکس مرتب بازه‌های رزرو یک هتل.
+    تعداد بازه‌های هم‌پوشان با [a, b) برابر است با
+    (تعداد شروع‌های کوچکتر از b) - (تعداد پایان‌های کوچکتر یا مساوی a)
+    که با دو جستجوی دودویی در O(log n) محاسبه می‌شود.
+    """
+
+    __slots__ = ("starts", "ends", "by_booking")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.by_booking = {}
+
+    def add(self, booking_id: int, check_in_date: date, check_out_date: date):
+        self.remove(booking_id)
+        start, end = check_in_date.toordinal(), check_out_date.toordinal()
+        self.by_booking[booking_id] = (start, end)
+        insort(self.starts, start)
+        insort(self.ends, end)
+
+    def remove(self, booking_id: int):
+        interval = self.by_booking.pop(booking_id, None)
+        if interval is None:
+            return
+        start, end = interval
+        del self.starts[bisect_left(self.starts, start)]
+        del self.ends[bisect_left(self.ends, end)]
+
+    def count_overlaps(self, check_in_date: date, check_out_date: date) -> int:
+        started = bisect_left(self.starts, check_out_date.toordinal())
+        finished = bisect_right(self.ends, check_in_date.toordinal())
+        return started - finished
+
+
+def load_interval_indexes(db: Session, hotel_ids, check_in_date: date, check_out_date: date) -> dict:
+    """
+    رزروهای فعال چند هتل در بازه داده‌شده را با یک کوئری می‌خواند و برای هر هتل
+    یک HotelIntervalIndex می‌سازد (برای بررسی دسته‌ای هم‌پوشانی‌ها).
+    """
+    indexes = {hotel_id: HotelIntervalIndex() for hotel_id in hotel_ids}
+    if not indexes:
+        return indexes
+    rows = db.query(Booking.id, Booking.hotel_id, Booking.check_in_date, Booking.check_out_date).filter(
+        Booking.hotel_id.in_(list(indexes)),
+        Booking.check_in_date < check_out_date,
+        Booking.check_out_date > check_in_date,
+        Booking.status != CANCELLED
+    )
+    for booking_id, hotel_id, start, end in rows:
+        indexes[hotel_id].add(booking_id, start, end)
+    return indexes
+
+
+class AvailabilityEngine:
+    """
+    بررسی خالی بودن هتل. مرجع نهایی همیشه کوئری exists() روی ix_bookings_hotel_dates در
+    همان تراکنش نوشتن است. ایندکس درون‌حافظه (اختیاری، AVAILABILITY_INDEX) فقط فیلتر منفی است:
+    اگر هم‌پوشانی نشان دهد درخواست بدون کوئری رد می‌شود. این ایندکس مخصوص هر پروسه است؛
+    لغو رزرو در پروسه دیگر را نمی‌بیند و برای همین ایندکس هر هتل پس از ttl ثانیه از نو ساخته می‌شود.
+    """
+
+    def __init__(self, use_index: bool = AVAILABILITY_INDEX, ttl: float = AVAILABILITY_INDEX_TTL):
+        self.use_index = use_index
+        self.ttl = ttl
+        # hotel_id -> (HotelIntervalIndex, زمان ساخت)
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, hotel_id: int) -> HotelIntervalIndex:
+        entry = self._indexes.get(hotel_id)
+        if entry is not None and time.monotonic() - entry[1] <= self.ttl:
+            return entry[0]
+        loaded_at = time.monotonic()
+        rows = db.query(Booking.id, Booking.check_in_date, Booking.check_out_date).filter(
+            Booking.hotel_id == hotel_id,
+            Booking.status != CANCELLED
+        ).all()
+        index = HotelIntervalIndex()
+        for booking_id, check_in_date, check_out_date in rows:
+            index.add(booking_id, check_in_date, check_out_date)
+        with self._lock:
+            # اگر پروسه همزمان ایندکس تازه‌تری ساخته باشد همان نگه داشته می‌شود
+            current = self._indexes.get(hotel_id)
+            if current is not None and current[1] > loaded_at:
+                return current[0]
+            self._indexes[hotel_id] = (index, loaded_at)
+        return index
+
+    def is_available(self, db: Session, hotel_id: int, check_in_date: date, check_out_date: date) -> bool:
+        """
+        بررسی می‌کند که بازه [check_in, check_out) برای هتل آزاد باشد.
+        باید با session نوشتن (BEGIN IMMEDIATE در SQLite) و پیش از INSERT صدا زده شود.
+        """
+        if self.use_index:
+            index = self._load(db, hotel_id)
+            with self._lock:
+                if index.count_overlaps(check_in_date, check_out_date):
+                    return False
+        if db.query(exists().where(*overlap_filter(hotel_id, check_in_date, check_out_date))).scalar():
+            # ایندکس این پروسه از رزروی که جای دیگری ثبت شده خبر نداشته است
+            self.invalidate(hotel_id)
+            return False
+        return True
+
+    def sync(self, booking_id: int, hotel_id: int, check_in_date: date, check_out_date: date, status: str):
+        """
+        ایندکس را پس از commit ایجاد یا تغییر یک رزرو به‌روز می‌کند.
+        مقادیر باید پیش از commit خوانده شوند تا اینجا کوئری refresh اجرا نشود.
+        """
+        if not self.use_index:
+            return
+        with self._lock:
+            entry = self._indexes.get(hotel_id)
+            if entry is None:
+                return
+            if status == CANCELLED:
+                entry[0].remove(booking_id)
+            else:
+                entry[0].add(booking_id, check_in_date, check_out_date)
+
+    def invalidate(self, hotel_id: int = None):
+        """ایندکس یک هتل (یا همه هتل‌ها) را دور می‌ریزد تا دوباره از دیتابیس ساخته شود."""
+        if not self.use_index:
+            return
+        with self._lock:
+            if hotel_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(hotel_id, None)
+
+
+availability_engine = AvailabilityEngine()
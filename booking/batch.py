@@ -0,0 +1,33 @@
+from typing import Optional
+
+from fastapi import HTTPException, Query
+
+# حداکثر تعداد شناسه در یک درخواست دسته‌ای
+MAX_BATCH_IDS = 100
+
+
+def batch_ids(
+    ids: Optional[str] = Query(None, description="Comma-separated ids to fetch in one call, e.g. 3,1,2")
+) -> Optional[list]:
+    """
+    پارامتر ids را به لیست شناسه‌ها تبدیل می‌کند؛ تکراری‌ها حذف و ترتیب درخواست حفظ می‌شود.
+    اگر پارامتر ارسال نشده باشد None برمی‌گرداند.
+    """
+    if ids is None:
+        return None
+    try:
+        values = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be a comma-separated list of integers")
+    values = list(dict.fromkeys(values))
+    if not values:
+        raise HTTPException(status_code=422, detail="ids must not be empty")
+    if len(values) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail="At most %d ids can be requested at once" % MAX_BATCH_IDS)
+    return values
+
+
+def in_request_order(rows, ids: list, key=lambda row: row.id) -> list:
+    """ردیف‌های یک کوئری IN را به ترتیب شناسه‌های درخواست مرتب می‌کند؛ شناسه‌های ناموجود حذف می‌شوند."""
+    by_id = {key(row): row for row in rows}
+    return [by_id[i] for i in ids if i in by_id]
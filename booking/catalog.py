@@ -0,0 +1,181 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import threading
+import time
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from booking.config import CATALOG_PROBE_INTERVAL, CATALOG_TTL
+from booking.models import Hotel
+from booking.pagination import NEXT_CURSOR_HEADER
+from booking.schemas import HotelResponse
+
+
+def hotel_record(hotel: Hotel) -> dict:
+    """ردیف هتل را به dict خروجی HotelResponse تبدیل می‌کند."""
+    return HotelResponse.model_validate(hotel, from_attributes=True).model_dump()
+
+
+def table_signature(db: Session) -> tuple:
+    """
+    نسخه ارزان جدول hotels: (تعداد ردیف‌ها، آخرین updated_at).
+    ایجاد و ویرایش updated_at را و حذف تعداد را تغییر می‌دهد؛ کش‌های هر پروسه با مقایسه آن
+    تغییراتی را که پروسه‌های دیگر نوشته‌اند تشخیص می‌دهند.
+    """
+    return tuple(db.query(func.count(Hotel.id), func.max(Hotel.updated_at)).one())
+
+
+def _price(record: dict) -> float:
+    price = record["price_per_night"]
+    return float("nan") if price is None else price
+
+
+class CatalogSnapshot:
+    """
+    نسخه تغییرناپذیر و ستونی کاتالوگ هتل‌ها.
+    ردیف‌ها به ترتیب id نگهداری می‌شوند و یک ترتیب جداگانه بر اساس قیمت
+    فیلتر بازه قیمت را با جستجوی دودویی ممکن می‌کند.
+    """
+
+    __slots__ = ("records", "ids", "prices", "wifi", "price_order", "sorted_prices")
+
+    def __init__(self, records: list):
+        self.records = records
+        self.ids = array("q", (record["id"] for record in records))
+        self.prices = array("d", (_price(record) for record in records))
+        self.wifi = bytes(bool(record["has_wifi"]) for record in records)
+        # هتل‌های بدون قیمت مانند SQL در هیچ فیلتر قیمتی ظاهر نمی‌شوند
+        priced = (i for i, record in enumerate(records) if record["price_per_night"] is not None)
+        self.price_order = array("q", sorted(priced, key=self.prices.__getitem__))
+        self.sorted_prices = array("d", (self.prices[i] for i in self.price_order))
+
+    def get(self, hotel_id: int):
+        i = bisect_left(self.ids, hotel_id)
+        if i < len(self.ids) and self.ids[i] == hotel_id:
+            return self.records[i]
+        return None
+
+    def filter(self, min_price=None, max_price=None, has_wifi=None, cursor=None, limit=None):
+        """ردیف‌های منطبق با فیلترها را به ترتیب id و پس از cursor برمی‌گرداند."""
+        start = 0 if cursor is None else bisect_right(self.ids, cursor)
+        if min_price is None and max_price is None:
+            positions = range(start, len(self.records))
+        else:
+            low = 0 if min_price is None else bisect_left(self.sorted_prices, min_price)
+            high = len(self.sorted_prices) if max_price is None else bisect_right(self.sorted_prices, max_price)
+            positions = sorted(i for i in self.price_order[low:high] if i >= start)
+        result = []
+        for i in positions:
+            if has_wifi is not None and self.wifi[i] != has_wifi:
+                continue
+            result.append(self.records[i])
+            if limit is not None and len(result) == limit:
+                break
+        return result
+
+
+class HotelCatalog:
+    """
+    کش درون‌حافظه کاتالوگ هتل‌ها با به‌روزرسانی write-through از روتر hotels.
+    کش مخصوص هر پروسه است؛ نوشتن‌های پروسه‌های دیگر با بررسی table_signature حداکثر هر
+    probe_interval ثانیه یک بار دیده می‌شوند. بین این بررسی‌ها خواندن‌ها بدون قفل و بدون
+    کوئری از آخرین snapshot انجام می‌شوند.
+    """
+
+    def __init__(self, ttl: float = CATALOG_TTL, probe_interval: float = CATALOG_PROBE_INTERVAL):
+        self.ttl = ttl
+        self.probe_interval = probe_interval
+        self.hits = 0
+        self.misses = 0
+        # با هر بارگذاری کامل از دیتابیس زیاد می‌شود تا ایندکس‌های ساخته‌شده از snapshot هم بازسازی شوند
+        self.version = 0
+        self._snapshot = None
+        self._signature = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> CatalogSnapshot:
+        generation = self._generation
+        signature = table_signature(db)
+        records = [hotel_record(hotel) for hotel in db.query(Hotel).order_by(Hotel.id).yield_per(1000)]
+        snapshot = CatalogSnapshot(records)
+        with self._lock:
+            # اگر در حین بارگذاری نوشتنی انجام شده باشد، snapshot قدیمی نصب نمی‌شود
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._signature = signature
+                self._loaded_at = self._checked_at = time.monotonic()
+                self.version += 1
+        return snapshot
+
+    def cached(self):
+        """snapshot فعلی یا None اگر کش سرد، منقضی یا زمان بررسی نسخه آن رسیده باشد."""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is None or now - self._loaded_at > self.ttl or now - self._checked_at > self.probe_interval:
+            return None
+        self.hits += 1
+        return snapshot
+
+    def snapshot(self, db: Session) -> CatalogSnapshot:
+        snapshot = self.cached()
+        if snapshot is not None:
+            return snapshot
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._loaded_at <= self.ttl:
+            if table_signature(db) == self._signature:
+                self._checked_at = time.monotonic()
+                self.hits += 1
+                return snapshot
+        self.misses += 1
+        return self.load(db)
+
+    def _replace(self, hotel_id: int, record):
+        with self._lock:
+            self._generation += 1
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            records = list(snapshot.records)
+            i = bisect_left(snapshot.ids, hotel_id)
+            exists = i < len(records) and records[i]["id"] == hotel_id
+            if record is None:
+                if exists:
+                    del records[i]
+            elif exists:
+                records[i] = record
+            else:
+                records.insert(i, record)
+            self._snapshot = CatalogSnapshot(records)
+
+    def upsert(self, hotel: Hotel):
+        """هتل ایجاد یا ویرایش‌شده را در کش می‌نویسد."""
+        self._replace(hotel.id, hotel_record(hotel))
+
+    def remove(self, hotel_id: int):
+        self._replace(hotel_id, None)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        size = len(self._snapshot.records) if self._snapshot is not None else 0
+        return {"hits": self.hits, "misses": self.misses, "size": size, "hit_ratio": self.hits / total if total else 0.0}
+
+
+hotel_catalog = HotelCatalog()
+
+
+def catalog_page(snapshot: CatalogSnapshot, min_price, max_price, has_wifi, page, response):
+    """یک صفحه keyset از کاتالوگ کش‌شده؛ مشابه keyset_page برای دیتابیس."""
+    rows = snapshot.filter(min_price, max_price, has_wifi, cursor=page.cursor, limit=page.limit + 1)
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(rows[-1]["id"])
+    return rows
@@ -0,0 +1,78 @@
+import os
+
+# تنظیمات برنامه از متغیرهای محیطی خوانده می‌شوند و مقدار پیش‌فرض دارند
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# کش کاربران احراز هویت‌شده در get_current_user
+PRINCIPAL_CACHE_SIZE = env_int("PRINCIPAL_CACHE_SIZE", 10000)
+PRINCIPAL_CACHE_TTL = env_float("PRINCIPAL_CACHE_TTL", 60)
+
+# کش توکن‌های JWT تایید‌شده (کلید: هش توکن)
+TOKEN_CACHE_SIZE = env_int("TOKEN_CACHE_SIZE", 50000)
+TOKEN_CACHE_TTL = env_float("TOKEN_CACHE_TTL", 30 * 60)
+
+# استخر پروسه‌ها برای هش bcrypt؛ بیش از این تعداد هش همزمان پذیرفته نمی‌شود
+HASH_POOL_SIZE = env_int("HASH_POOL_SIZE", max(1, (os.cpu_count() or 2) // 2))
+HASH_RETRY_AFTER = env_int("HASH_RETRY_AFTER", 1)
+
+# فعال کردن موتور async (SQLAlchemy asyncio) در کنار موتور sync برای مسیرهای async
+DB_ASYNC = env_bool("DB_ASYNC", False)
+
+# اتصال دیتابیس و تنظیمات استخر اتصال‌ها
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./hotel_booking.db")
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+# حداکثر زمان اجرای هر دستور SQL به میلی‌ثانیه (0 یعنی بدون محدودیت)
+DB_STATEMENT_TIMEOUT_MS = env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+
+# پروفایل کارایی SQLite که روی هر اتصال اعمال می‌شود
+SQLITE_BUSY_TIMEOUT = env_float("SQLITE_BUSY_TIMEOUT", 5)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+# مقدار منفی یعنی اندازه کش به کیلوبایت
+SQLITE_CACHE_SIZE = env_int("SQLITE_CACHE_SIZE", -64 * 1024)
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+
+# دیتابیس فقط‌خواندنی (replica)؛ اگر خالی باشد برای SQLite یک اتصال query_only به همان فایل ساخته می‌شود
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+# مدتی که پس از هر نوشتن، خواندن‌های همان کاربر از دیتابیس اصلی انجام می‌شود
+READ_YOUR_WRITES_SECONDS = env_int("READ_YOUR_WRITES_SECONDS", 5)
+READ_YOUR_WRITES_COOKIE = os.getenv("READ_YOUR_WRITES_COOKIE", "recent_write")
+
+# ایندکس درون‌حافظه بازه‌های رزرو به عنوان فیلتر منفی پیش از کوئری هم‌پوشانی (پیش‌فرض خاموش)
+AVAILABILITY_INDEX = env_bool("AVAILABILITY_INDEX", False)
+# عمر ایندکس هر هتل (ثانیه)؛ لغو رزرو در پروسه‌های دیگر حداکثر پس از این مدت دیده می‌شود
+AVAILABILITY_INDEX_TTL = env_float("AVAILABILITY_INDEX_TTL", 30)
+
+# کش کاتالوگ هتل‌ها؛ پس از این مدت (ثانیه) از دیتابیس دوباره ساخته می‌شود
+CATALOG_TTL = env_float("CATALOG_TTL", 300)
+# فاصله بررسی نسخه جدول hotels (تعداد و آخرین updated_at) برای دیدن تغییرات پروسه‌های دیگر
+CATALOG_PROBE_INTERVAL = env_float("CATALOG_PROBE_INTERVAL", 5)
+
+# سقف تعداد دستورهای SQL هر درخواست (برای تست‌ها؛ 0 یعنی بدون محدودیت)
+SQL_STATEMENT_LIMIT = env_int("SQL_STATEMENT_LIMIT", 0)
+# دستورهای SQL کندتر از این مقدار (میلی‌ثانیه) در لاگ booking.slow_query ثبت می‌شوند
+SLOW_QUERY_MS = env_float("SLOW_QUERY_MS", 100)
+
+# حداکثر تعداد ردیف در هر درخواست ورود دسته‌ای رزروها و اندازه هر دسته INSERT
+BULK_BOOKING_MAX_ROWS = env_int("BULK_BOOKING_MAX_ROWS", 10000)
+BULK_INSERT_CHUNK_SIZE = env_int("BULK_INSERT_CHUNK_SIZE", 1000)
@@ -1,11 +1,19 @@
+import argparse
+
 from booking.database import Base, engine
 from booking import models
+from booking import migrations
 
-# ایجاد جداول در دیتابیس
-def create_tables():
+# ایجاد جداول در دیتابیس و اعمال مهاجرت‌های باقیمانده روی دیتابیس موجود
+def create_tables(dry_run: bool = False):
+    if dry_run:
+        migrations.upgrade(engine, dry_run=True)
+        return
     Base.metadata.create_all(bind=engine)
     print("Tables created successfully!")
+    migrations.upgrade(engine)
 
 if __name__ == "__main__":
-    create_tables()
-
+    parser = argparse.ArgumentParser(description="Create tables and apply pending schema migrations")
+    parser.add_argument("--dry-run", action="store_true", help="print the migration plan without changing the database")
+    create_tables(dry_run=parser.parse_args().dry_run)
@@ -1,29 +1,220 @@
-from sqlalchemy import create_engine, text
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from booking.config import (
+    DATABASE_REPLICA_URL, DATABASE_URL, DB_ASYNC, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE,
+    DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_STATEMENT_TIMEOUT_MS, SQLITE_BUSY_TIMEOUT, SQLITE_CACHE_SIZE,
+    SQLITE_JOURNAL_MODE, SQLITE_MMAP_SIZE, SQLITE_SYNCHRONOUS, SQLITE_TEMP_STORE,
+    READ_YOUR_WRITES_COOKIE, READ_YOUR_WRITES_SECONDS,
+)
+from booking.metrics import timed_pool_class
 
-DATABASE_URL = "sqlite:///./hotel_booking.db"
+# متدهای HTTP که فقط داده می‌خوانند و با تراکنش DEFERRED اجرا می‌شوند
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={
-        "check_same_thread": False, 
-        "timeout": 30, 
-        "isolation_level": "IMMEDIATE"
-    }
+# PRAGMAهای پروفایل کارایی SQLite
+SQLITE_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA journal_mode=%s" % SQLITE_JOURNAL_MODE,
+    "PRAGMA synchronous=%s" % SQLITE_SYNCHRONOUS,
+    "PRAGMA mmap_size=%d" % SQLITE_MMAP_SIZE,
+    "PRAGMA cache_size=%d" % SQLITE_CACHE_SIZE,
+    "PRAGMA temp_store=%s" % SQLITE_TEMP_STORE,
 )
 
-engine.connect().execute(text("PRAGMA foreign_keys=ON"))  # توجه کنید که foreign_keys باید درست نوشته شود
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def engine_options(url, is_async: bool = False, name: str = "primary") -> dict:
+    """تنظیمات استخر اتصال و connect_args مناسب هر نوع دیتابیس را برمی‌گرداند."""
+    url = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    # همان کلاس استخر پیش‌فرض dialect، با زمان‌سنجی گرفتن اتصال برای /metrics
+    options["poolclass"] = timed_pool_class(url.get_dialect().get_pool_class(url), name)
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"timeout": SQLITE_BUSY_TIMEOUT}
+        if not is_async:
+            options["connect_args"]["check_same_thread"] = False
+        # دیتابیس درون‌حافظه (SingletonThreadPool) و aiosqlite (NullPool) استخر قابل تنظیم ندارند
+        if is_async or url.database in (None, "", ":memory:"):
+            return options
+    options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+# دستورهایی که اتصال‌های موتور replica را فقط‌خواندنی می‌کنند
+READ_ONLY_STATEMENTS = {
+    "sqlite": "PRAGMA query_only=ON",
+    "mysql": "SET SESSION TRANSACTION READ ONLY",
+    "postgresql": "SET default_transaction_read_only = on",
+}
+
+def configure_connections(engine, read_only: bool = False):
+    """PRAGMAها و محدودیت زمان اجرا را روی هر اتصال جدید استخر اعمال می‌کند."""
+    backend = engine.dialect.name
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        if backend == "sqlite":
+            # مدیریت تراکنش درایور غیرفعال می‌شود تا BEGIN را خودمان در رویداد begin بفرستیم
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            if backend == "sqlite":
+                for pragma in SQLITE_PRAGMAS:
+                    cursor.execute(pragma)
+            elif backend == "mysql" and DB_STATEMENT_TIMEOUT_MS:
+                cursor.execute("SET SESSION max_execution_time = %d" % DB_STATEMENT_TIMEOUT_MS)
+            elif backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS:
+                cursor.execute("SET statement_timeout = %d" % DB_STATEMENT_TIMEOUT_MS)
+            if read_only and backend in READ_ONLY_STATEMENTS:
+                cursor.execute(READ_ONLY_STATEMENTS[backend])
+        finally:
+            cursor.close()
+
+    if backend == "sqlite":
+        @event.listens_for(engine, "begin")
+        def on_begin(conn):
+            # تراکنش‌ها به صورت پیش‌فرض DEFERRED هستند و قفل نوشتن را فقط با اولین نوشتن می‌گیرند؛
+            # sessionهای نوشتنی (SessionLocal) با sqlite_begin=IMMEDIATE قفل را از ابتدا می‌گیرند
+            # تا ارتقای تراکنش خواندن به نوشتن با SQLITE_BUSY شکست نخورد
+            conn.exec_driver_sql("BEGIN " + conn.get_execution_options().get("sqlite_begin", "DEFERRED"))
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+configure_connections(engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine.execution_options(sqlite_begin="IMMEDIATE"))
+PrimaryReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine.execution_options(sqlite_begin="DEFERRED"))
+
+def create_read_engine():
+    """
+    موتور خواندن را می‌سازد: replica مشخص‌شده در DATABASE_REPLICA_URL،
+    یا برای فایل SQLite یک استخر جداگانه با اتصال‌های query_only.
+    در غیر این صورت همان موتور اصلی استفاده می‌شود.
+    """
+    url = DATABASE_REPLICA_URL
+    if not url:
+        primary = make_url(DATABASE_URL)
+        if primary.get_backend_name() != "sqlite" or primary.database in (None, "", ":memory:"):
+            return engine
+        url = DATABASE_URL
+    read_engine = create_engine(url, execution_options={"sqlite_begin": "DEFERRED"}, **engine_options(url, name="read"))
+    configure_connections(read_engine, read_only=True)
+    return read_engine
+
+read_engine = create_read_engine()
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine.execution_options(sqlite_begin="DEFERRED"))
 
 # ایجاد Base برای تعریف مدل‌ها
 Base = declarative_base()
 
-def get_db():
+def reads_from_primary(request: Request) -> bool:
+    """
+    خواندن‌ها به replica می‌روند، مگر اینکه کاربر اخیراً چیزی نوشته باشد؛
+    در آن صورت تا پایان پنجره read-your-writes از دیتابیس اصلی خوانده می‌شود.
+    بدون DATABASE_REPLICA_URL موتور خواندن همان دیتابیس اصلی را می‌بیند و کوکی نادیده گرفته می‌شود.
+    """
+    return bool(DATABASE_REPLICA_URL) and READ_YOUR_WRITES_COOKIE in request.cookies
+
+def read_session_factory(request: Request):
+    return PrimaryReadSessionLocal if reads_from_primary(request) else ReadSessionLocal
+
+def get_db(request: Request):
+    # درخواست‌های GET به موتور خواندن و بقیه با تراکنش DEFERRED به دیتابیس اصلی می‌روند؛
+    # مسیرهایی که می‌نویسند از get_write_db استفاده می‌کنند
+    factory = read_session_factory(request) if request.method in READ_METHODS else PrimaryReadSessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_write_db():
+    """session دیتابیس اصلی با BEGIN IMMEDIATE برای مسیرهایی که داده تغییر می‌دهند."""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def get_read_db(request: Request):
+    """session فقط‌خواندنی برای مسیرهایی که هیچ‌وقت نمی‌نویسند."""
+    db = read_session_factory(request)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+class ReadYourWritesMiddleware:
+    """
+    پس از هر درخواست نوشتنی موفق، کوکی کوتاه‌مدتی تنظیم می‌کند تا خواندن‌های بعدی
+    همان کاربر تا READ_YOUR_WRITES_SECONDS ثانیه از دیتابیس اصلی انجام شود.
+    فقط وقتی replica واقعی (DATABASE_REPLICA_URL) تنظیم شده باشد کوکی گذاشته می‌شود.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie = (
+            "%s=1; Max-Age=%d; Path=/; HttpOnly; SameSite=Lax"
+            % (READ_YOUR_WRITES_COOKIE, READ_YOUR_WRITES_SECONDS)
+        ).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or not DATABASE_REPLICA_URL:
+            await self.app(scope, receive, send)
+            return
 
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message.setdefault("headers", []).append((b"set-cookie", self.cookie))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+# درایورهای async متناظر با هر دیتابیس
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url(url):
+    """آدرس دیتابیس sync را به آدرس درایور async همان دیتابیس تبدیل می‌کند."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+def create_async_read_engine(primary):
+    """
+    موتور async خواندن با همان قاعده create_read_engine: replica، یا برای فایل SQLite
+    استخری جداگانه با اتصال‌های query_only؛ در غیر این صورت همان موتور async اصلی.
+    """
+    if read_engine is engine:
+        return primary
+    url = async_database_url(DATABASE_REPLICA_URL or DATABASE_URL)
+    async_read_engine = create_async_engine(
+        url, execution_options={"sqlite_begin": "DEFERRED"}, **engine_options(url, is_async=True, name="async_read")
+    )
+    configure_connections(async_read_engine.sync_engine, read_only=True)
+    return async_read_engine
+
+# موتورهای async فقط در صورت فعال بودن DB_ASYNC ساخته می‌شوند
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if DB_ASYNC:
+    async_url = async_database_url(DATABASE_URL)
+    async_engine = create_async_engine(
+        async_url, execution_options={"sqlite_begin": "DEFERRED"}, **engine_options(async_url, is_async=True, name="async")
+    )
+    configure_connections(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    async_read_engine = create_async_read_engine(async_engine)
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db(request: Request):
+    # مانند get_db: GETها از موتور خواندن async و با قاعده read-your-writes
+    if request.method in READ_METHODS and not reads_from_primary(request):
+        factory = AsyncReadSessionLocal
+    else:
+        factory = AsyncSessionLocal
+    async with factory() as db:
+        yield db
@@ -0,0 +1,149 @@
+import csv
+import io
+from datetime import date
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from booking.models import Booking, Hotel, User
+
+# تعداد ردیفی که در هر رفت‌وبرگشت از cursor سمت سرور خوانده و به صورت یک تکه نوشته می‌شود
+EXPORT_BATCH_SIZE = 5000
+EXPORT_FORMATS = ("csv", "arrow", "parquet")
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# ستون‌های خروجی: رزرو به همراه اطلاعات هتل و کاربر
+EXPORT_COLUMNS = (
+    Booking.id.label("booking_id"),
+    Booking.status,
+    Booking.check_in_date,
+    Booking.check_out_date,
+    Booking.created_at,
+    Hotel.id.label("hotel_id"),
+    Hotel.name.label("hotel_name"),
+    Hotel.location.label("hotel_location"),
+    Booking.price_per_night,  # قیمت زمان رزرو، نه قیمت فعلی هتل
+    User.id.label("user_id"),
+    User.email.label("user_email"),
+    User.name.label("user_name"),
+    User.lastname.label("user_lastname"),
+)
+
+
+def export_statement(start_date: date = None, end_date: date = None, hotel_ids=None, manager_id: int = None):
+    """
+    دستور select خروجی؛ رزروهایی که با بازه [start_date, end_date) هم‌پوشانی دارند.
+    با manager_id فقط رزروهای هتل‌های آن مدیر برگردانده می‌شوند.
+    """
+    stmt = select(*EXPORT_COLUMNS).join(Hotel, Booking.hotel_id == Hotel.id).outerjoin(User, Booking.user_id == User.id)
+    if start_date is not None:
+        stmt = stmt.where(Booking.check_out_date > start_date)
+    if end_date is not None:
+        stmt = stmt.where(Booking.check_in_date < end_date)
+    if hotel_ids:
+        stmt = stmt.where(Booking.hotel_id.in_(hotel_ids))
+    if manager_id is not None:
+        stmt = stmt.where(Hotel.user_id == manager_id)
+    return stmt.order_by(Booking.id)
+
+
+def _partitions(stmt, session_factory):
+    """
+    ردیف‌ها را با cursor سمت سرور (stream_results) و session جداگانه، دسته به دسته برمی‌گرداند
+    تا مصرف حافظه مستقل از تعداد رزروها بماند.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(stmt, execution_options={"stream_results": True, "yield_per": EXPORT_BATCH_SIZE})
+        for rows in result.partitions():
+            yield rows
+    finally:
+        db.close()
+
+
+def _csv_chunks(partitions, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # اگر هیچ ردیفی نباشد فقط سطر عنوان فرستاده می‌شود
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """فایل فقط-نوشتنی که بایت‌های نوشته‌شده توسط pyarrow را تا ارسال تکه بعدی نگه می‌دارد."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _arrow_chunks(partitions, columns, file_format: str):
+    """هر دسته ردیف یک RecordBatch می‌شود (در parquet یک row group)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise HTTPException(status_code=501, detail="pyarrow is required for %s exports" % file_format)
+
+    # schema ثابت است تا ستون‌های تماماً خالی یک دسته نوع دیگری استنتاج نکنند
+    types = {"date": pa.date32(), "datetime": pa.timestamp("us"), "float": pa.float64(), "int": pa.int64(), "str": pa.string()}
+    schema = pa.schema([(column.key, types[column.type.python_type.__name__]) for column in EXPORT_COLUMNS])
+
+    def generate():
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema) if file_format == "parquet" else pa.ipc.new_stream(sink, schema)
+        for rows in partitions:
+            writer.write_batch(pa.RecordBatch.from_pydict(
+                {name: [row[i] for row in rows] for i, name in enumerate(columns)}, schema=schema
+            ))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return generate()
+
+
+def stream_export(stmt, session_factory, file_format: str = "csv") -> StreamingResponse:
+    """
+    خروجی را با session ساخته‌شده از session_factory (معمولاً read_session_factory(request))
+    تکه به تکه استریم می‌کند. generator همگام است و Starlette آن را در threadpool اجرا می‌کند،
+    پس خواندن از دیتابیس حلقه رویداد را مسدود نمی‌کند.
+    file_format باید یکی از EXPORT_FORMATS باشد؛ اعتبارسنجی آن با پارامتر مسیر انجام می‌شود.
+    """
+    columns = [column.key for column in EXPORT_COLUMNS]
+    partitions = _partitions(stmt, session_factory)
+    if file_format == "csv":
+        body = _csv_chunks(partitions, columns)
+    else:
+        body = _arrow_chunks(partitions, columns, file_format)
+    extension = "arrows" if file_format == "arrow" else file_format
+    return StreamingResponse(body, media_type=MEDIA_TYPES[file_format], headers={
+        "Content-Disposition": 'attachment; filename="bookings.%s"' % extension
+    })
@@ -0,0 +1,70 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from booking.config import HASH_POOL_SIZE, HASH_RETRY_AFTER
+
+# تنظیم رمزگذاری پسورد
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# مسیرهای ثبت‌نام و ورود همگام هستند و ترد تردپول Starlette تا پایان هش منتظر می‌ماند؛
+# پذیرش به اندازه استخر محدود است تا هر ترد پذیرفته‌شده فقط به اندازه یک هش مسدود شود
+# و صفی از تردهای منتظر شکل نگیرد. بقیه درخواست‌ها فوراً 503 می‌گیرند
+_slots = threading.BoundedSemaphore(HASH_POOL_SIZE)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=HASH_POOL_SIZE,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _executor
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent password operations, please retry",
+            headers={"Retry-After": str(HASH_RETRY_AFTER)},
+        )
+    try:
+        return _get_executor().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password: str) -> str:
+    """پسورد را در استخر پروسه‌ها هش می‌کند."""
+    return _run(_hash, password)
+
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    """پسورد را در استخر پروسه‌ها با هش ذخیره‌شده مقایسه می‌کند."""
+    return _run(_verify, plain_password, hashed_password)
+
+
+def shutdown():
+    """استخر پروسه‌ها را هنگام خاموش شدن برنامه می‌بندد."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,137 @@
+import threading
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from booking.catalog import CatalogSnapshot, HotelCatalog, hotel_catalog
+
+# کلیدهای مرتب‌سازی مجاز در صفحه جستجو
+SORT_KEYS = ("price_asc", "price_desc", "rating", "newest")
+DEFAULT_HISTOGRAM_BINS = 10
+
+
+class HotelIndex:
+    """
+    ایندکس ستونی هتل‌ها روی آرایه‌های NumPy.
+    همه فیلترها به یک ماسک بولی تبدیل می‌شوند و نتایج، مرتب‌سازی top-k و
+    شمارش facetها در یک گذر برداری روی همان ماسک محاسبه می‌شوند.
+    از روی ردیف‌های snapshot کاتالوگ (به ترتیب id) ساخته می‌شود.
+    """
+
+    def __init__(self, records: list):
+        self.records = records
+        # id به ترتیب ایجاد هتل‌ها افزایش می‌یابد و کلید مرتب‌سازی newest است
+        self.ids = np.array([record["id"] for record in records], dtype=np.float64)
+        self.price = np.array(
+            [np.nan if record["price_per_night"] is None else record["price_per_night"] for record in records],
+            dtype=np.float64
+        )
+        self.wifi = np.array([bool(record["has_wifi"]) for record in records], dtype=bool)
+        self.rating = np.array(
+            [np.nan if record["average_rating"] is None else record["average_rating"] for record in records],
+            dtype=np.float64
+        )
+        # مکان‌ها به کد عددی تبدیل می‌شوند تا فیلتر و شمارش آن‌ها برداری باشد
+        self.locations, self.location_code = np.unique(
+            np.array([record["location"] for record in records], dtype=object).astype(str), return_inverse=True
+        )
+
+    def __len__(self):
+        return len(self.records)
+
+    def mask(self, location=None, min_price=None, max_price=None, has_wifi=None, min_rating=None):
+        selected = np.ones(len(self), dtype=bool)
+        if location is not None:
+            code = np.searchsorted(self.locations, location)
+            if code == len(self.locations) or self.locations[code] != location:
+                return np.zeros(len(self), dtype=bool)
+            selected &= self.location_code == code
+        # مقایسه با NaN همیشه False است؛ هتل بی‌قیمت یا بی‌امتیاز در فیلتر مربوط حذف می‌شود
+        if min_price is not None:
+            selected &= self.price >= min_price
+        if max_price is not None:
+            selected &= self.price <= max_price
+        if has_wifi is not None:
+            selected &= self.wifi == has_wifi
+        if min_rating is not None:
+            selected &= self.rating >= min_rating
+        return selected
+
+    def top_k(self, positions, sort: str, limit: int):
+        """k ردیف اول را با argpartition انتخاب و فقط همان‌ها را مرتب می‌کند."""
+        if sort == "price_asc":
+            keys = self.price[positions]
+        elif sort == "price_desc":
+            keys = -self.price[positions]
+        elif sort == "rating":
+            keys = -self.rating[positions]
+        else:
+            keys = -self.ids[positions]
+        # مقادیر نامعلوم همیشه در انتهای نتایج قرار می‌گیرند
+        keys = np.where(np.isnan(keys), np.inf, keys)
+        if limit < len(positions):
+            candidates = np.argpartition(keys, limit - 1)[:limit]
+        else:
+            candidates = np.arange(len(positions))
+        # id دوم کلید مرتب‌سازی است تا ترتیب نتایج با مقادیر برابر پایدار بماند
+        order = candidates[np.lexsort((positions[candidates], keys[candidates]))]
+        return positions[order]
+
+    def facets(self, selected, bins: int) -> dict:
+        prices = self.price[selected]
+        prices = prices[~np.isnan(prices)]
+        histogram = []
+        if len(prices):
+            counts, edges = np.histogram(prices, bins=bins)
+            histogram = [
+                {"min": float(edges[i]), "max": float(edges[i + 1]), "count": int(counts[i])}
+                for i in range(len(counts))
+            ]
+        wifi = np.bincount(self.wifi[selected].astype(np.int64), minlength=2)
+        locations = np.bincount(self.location_code[selected], minlength=len(self.locations))
+        return {
+            "price_histogram": histogram,
+            "wifi": {"with_wifi": int(wifi[1]), "without_wifi": int(wifi[0])},
+            "locations": {str(self.locations[i]): int(locations[i]) for i in np.flatnonzero(locations)},
+        }
+
+    def browse(self, location=None, min_price=None, max_price=None, has_wifi=None, min_rating=None,
+               sort: str = "price_asc", limit: int = 20, bins: int = DEFAULT_HISTOGRAM_BINS) -> dict:
+        """نتایج، تعداد کل و facetهای صفحه جستجو را با یک فراخوانی برمی‌گرداند."""
+        selected = self.mask(location, min_price, max_price, has_wifi, min_rating)
+        positions = np.flatnonzero(selected)
+        results = [self.records[i] for i in self.top_k(positions, sort, limit)]
+        return {"total": int(len(positions)), "results": results, "facets": self.facets(selected, bins)}
+
+
+class HotelIndexCache:
+    """
+    HotelIndex آخرین snapshot کاتالوگ. هر snapshot تازه (نوشتن در همین پروسه یا بارگذاری دوباره
+    پس از تغییر در پروسه دیگر) ایندکس را از نو می‌سازد، پس تازگی آن همیشه همان تازگی HotelCatalog است.
+    """
+
+    def __init__(self, catalog: HotelCatalog = hotel_catalog):
+        self.catalog = catalog
+        self._snapshot = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _for(self, snapshot: CatalogSnapshot) -> HotelIndex:
+        with self._lock:
+            if self._snapshot is snapshot:
+                return self._index
+        index = HotelIndex(snapshot.records)
+        with self._lock:
+            self._snapshot, self._index = snapshot, index
+        return index
+
+    def cached(self):
+        """ایندکس snapshot فعلی یا None اگر کاتالوگ باید از دیتابیس بررسی یا بارگذاری شود."""
+        snapshot = self.catalog.cached()
+        return None if snapshot is None else self._for(snapshot)
+
+    def get(self, db: Session) -> HotelIndex:
+        return self._for(self.catalog.snapshot(db))
+
+
+hotel_index = HotelIndexCache()
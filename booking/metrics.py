@@ -0,0 +1,191 @@
+from bisect import bisect_left
+import threading
+import time
+
+# مرزهای هیستوگرام زمان پاسخ و زمان انتظار برای اتصال (ثانیه)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+# مسیرهایی که با هیچ route تطبیق نمی‌خورند زیر یک برچسب جمع می‌شوند تا تعداد سری‌ها محدود بماند
+UNMATCHED_ROUTE = "<unmatched>"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """
+    هیستوگرام با مرزهای ثابت؛ هر مشاهده فقط یک bisect و دو جمع است.
+    شمارش هر bucket جداگانه نگهداری و تجمعی بودن آن هنگام خروجی گرفتن محاسبه می‌شود.
+    بدون قفل است و فقط باید از یک thread (حلقه رویداد) به‌روز شود.
+    """
+
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: str):
+        prefix = labels + "," if labels else ""
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield '%s_bucket{%sle="%s"} %d' % (name, prefix, bound, total)
+        total += self.counts[-1]
+        yield '%s_bucket{%sle="+Inf"} %d' % (name, prefix, total)
+        yield "%s_sum{%s} %.6f" % (name, labels, self.sum)
+        yield "%s_count{%s} %d" % (name, labels, total)
+
+
+class ThreadSafeHistogram(Histogram):
+    """نسخه قفل‌دار برای مشاهده‌هایی که از threadهای مختلف می‌آیند (مانند checkout استخر)."""
+
+    __slots__ = ("lock",)
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        super().__init__(buckets)
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self.lock:
+            Histogram.observe(self, value)
+
+
+class RouteStats:
+    __slots__ = ("latency", "statuses")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = {}
+
+
+# آمار هر (method, route)؛ فقط از حلقه رویداد به‌روز می‌شود
+route_stats = {}
+in_flight = 0
+# زمان انتظار برای گرفتن اتصال از هر استخر، به تفکیک نام موتور
+pool_wait = {}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def timed_pool_class(base, name: str):
+    """
+    زیرکلاسی از کلاس استخر پیش‌فرض dialect می‌سازد که زمان connect() (گرفتن اتصال از استخر،
+    شامل انتظار برای آزاد شدن اتصال) را در هیستوگرام pool_wait ثبت می‌کند.
+    """
+    histogram = pool_wait.setdefault(name, ThreadSafeHistogram(POOL_WAIT_BUCKETS))
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return base.connect(self)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    return type("Timed" + base.__name__, (base,), {"connect": connect})
+
+
+class MetricsMiddleware:
+    """تعداد درخواست‌ها، هیستوگرام زمان پاسخ هر route و تعداد درخواست‌های در حال اجرا را ثبت می‌کند."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        global in_flight
+        in_flight += 1
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight -= 1
+            route = scope.get("route")
+            key = (scope["method"], getattr(route, "path", UNMATCHED_ROUTE))
+            stats = route_stats.get(key)
+            if stats is None:
+                stats = route_stats[key] = RouteStats()
+            stats.latency.observe(elapsed)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+
+def _cache_stats() -> dict:
+    from booking.auth import principal_cache, token_cache
+    from booking.catalog import hotel_catalog
+    return {
+        "principal": principal_cache.stats(),
+        "token": token_cache.stats(),
+        "hotel_catalog": hotel_catalog.stats(),
+    }
+
+
+def _pool_status() -> dict:
+    from booking.database import async_engine, async_read_engine, engine, read_engine
+    pools = {"primary": engine.pool, "read": read_engine.pool}
+    if async_engine is not None:
+        pools["async"] = async_engine.pool
+    if async_read_engine is not None and async_read_engine is not async_engine:
+        pools["async_read"] = async_read_engine.pool
+    return {name: pool.checkedout() for name, pool in pools.items() if hasattr(pool, "checkedout")}
+
+
+def render() -> str:
+    """همه متریک‌ها را در قالب متنی Prometheus برمی‌گرداند."""
+    lines = [
+        "# HELP booking_http_requests_total Requests by method, route and status.",
+        "# TYPE booking_http_requests_total counter",
+    ]
+    stats = list(route_stats.items())
+    for (method, route), route_stat in stats:
+        for status, count in sorted(route_stat.statuses.items()):
+            lines.append('booking_http_requests_total{method="%s",route="%s",status="%d"} %d'
+                         % (method, _escape(route), status, count))
+    lines += [
+        "# HELP booking_http_request_duration_seconds Request latency by method and route.",
+        "# TYPE booking_http_request_duration_seconds histogram",
+    ]
+    for (method, route), route_stat in stats:
+        labels = 'method="%s",route="%s"' % (method, _escape(route))
+        lines.extend(route_stat.latency.samples("booking_http_request_duration_seconds", labels))
+    lines += [
+        "# HELP booking_http_requests_in_flight Requests currently being served.",
+        "# TYPE booking_http_requests_in_flight gauge",
+        "booking_http_requests_in_flight %d" % in_flight,
+        "# HELP booking_db_pool_checkout_seconds Time spent acquiring a connection from the pool.",
+        "# TYPE booking_db_pool_checkout_seconds histogram",
+    ]
+    for name, histogram in pool_wait.items():
+        lines.extend(histogram.samples("booking_db_pool_checkout_seconds", 'engine="%s"' % name))
+    lines += [
+        "# HELP booking_db_pool_checked_out Connections currently checked out of the pool.",
+        "# TYPE booking_db_pool_checked_out gauge",
+    ]
+    for name, checked_out in _pool_status().items():
+        lines.append('booking_db_pool_checked_out{engine="%s"} %d' % (name, checked_out))
+    caches = _cache_stats()
+    for metric, kind, field in (
+        ("booking_cache_hits_total", "counter", "hits"),
+        ("booking_cache_misses_total", "counter", "misses"),
+        ("booking_cache_hit_ratio", "gauge", "hit_ratio"),
+        ("booking_cache_size", "gauge", "size"),
+    ):
+        lines.append("# TYPE %s %s" % (metric, kind))
+        for cache, values in caches.items():
+            lines.append('%s{cache="%s"} %s' % (metric, cache, values[field]))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,387 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+import importlib
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from booking.models import HotelDailyStats, WalletLedger, WalletSnapshot
+
+# جدول نگهداری نسخه‌های اعمال‌شده
+VERSION_TABLE = "schema_migrations"
+BACKFILL_BATCH_SIZE = 5000
+
+
+class Step(ABC):
+    """یک قدم مهاجرت؛ فقط در صورت نیاز اجرا می‌شود تا اجرای دوباره بی‌خطر باشد."""
+
+    @abstractmethod
+    def describe(self, dialect) -> str:
+        ...
+
+    def needed(self, conn) -> bool:
+        return True
+
+    @abstractmethod
+    def apply(self, engine):
+        ...
+
+
+class CreateIndex(Step):
+    """
+    ایجاد ایندکس بدون قفل طولانی:
+    در PostgreSQL با CONCURRENTLY و در MySQL با ALGORITHM=INPLACE, LOCK=NONE.
+    """
+
+    def __init__(self, table: str, name: str, columns, unique: bool = False):
+        self.table = table
+        self.name = name
+        self.columns = list(columns)
+        self.unique = unique
+
+    def sql(self, dialect) -> str:
+        unique = "UNIQUE " if self.unique else ""
+        columns = ", ".join(self.columns)
+        if dialect == "postgresql":
+            return "CREATE %sINDEX CONCURRENTLY IF NOT EXISTS %s ON %s (%s)" % (unique, self.name, self.table, columns)
+        if dialect == "mysql":
+            return "CREATE %sINDEX %s ON %s (%s) ALGORITHM=INPLACE LOCK=NONE" % (unique, self.name, self.table, columns)
+        return "CREATE %sINDEX IF NOT EXISTS %s ON %s (%s)" % (unique, self.name, self.table, columns)
+
+    def describe(self, dialect) -> str:
+        return self.sql(dialect)
+
+    def needed(self, conn) -> bool:
+        inspector = inspect(conn)
+        if not inspector.has_table(self.table):
+            return False
+        names = {index["name"] for index in inspector.get_indexes(self.table)}
+        names.update(constraint["name"] for constraint in inspector.get_unique_constraints(self.table))
+        return self.name not in names
+
+    def apply(self, engine):
+        if engine.dialect.name == "postgresql":
+            # CREATE INDEX CONCURRENTLY نباید داخل تراکنش اجرا شود
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.exec_driver_sql(self.sql(engine.dialect.name))
+        else:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(self.sql(engine.dialect.name))
+
+
+class AddColumn(Step):
+    """افزودن ستون به جدول موجود در صورت نبودن آن."""
+
+    def __init__(self, table: str, name: str, ddl: str):
+        self.table = table
+        self.name = name
+        self.ddl = ddl
+
+    def describe(self, dialect) -> str:
+        return "ALTER TABLE %s ADD COLUMN %s %s" % (self.table, self.name, self.ddl)
+
+    def needed(self, conn) -> bool:
+        inspector = inspect(conn)
+        if not inspector.has_table(self.table):
+            return False
+        return self.name not in {column["name"] for column in inspector.get_columns(self.table)}
+
+    def apply(self, engine):
+        with engine.begin() as conn:
+            conn.exec_driver_sql(self.describe(engine.dialect.name))
+
+
+class CreateTable(Step):
+    """ایجاد جدول جدید از روی مدل SQLAlchemy."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def describe(self, dialect) -> str:
+        return "CREATE TABLE %s (with its indexes)" % self.table.name
+
+    def needed(self, conn) -> bool:
+        return not inspect(conn).has_table(self.table.name)
+
+    def apply(self, engine):
+        self.table.create(engine, checkfirst=True)
+
+
+class ExecuteSQL(Step):
+    """اجرای یک دستور SQL دلخواه (مثلاً پاک‌سازی داده‌های تکراری)."""
+
+    def __init__(self, description: str, sql: str, table: str = None):
+        self.description = description
+        self.sql = sql
+        self.table = table
+
+    def describe(self, dialect) -> str:
+        return "%s: %s" % (self.description, self.sql)
+
+    def needed(self, conn) -> bool:
+        return self.table is None or inspect(conn).has_table(self.table)
+
+    def apply(self, engine):
+        with engine.begin() as conn:
+            conn.exec_driver_sql(self.sql)
+
+
+class Backfill(Step):
+    """
+    پر کردن داده‌ها به صورت دسته‌ای روی بازه‌های id؛
+    هر دسته در تراکنش جداگانه commit می‌شود تا قفل‌ها کوتاه بمانند.
+    """
+
+    def __init__(self, table: str, set_sql: str, where_sql: str = "1=1", batch_size: int = BACKFILL_BATCH_SIZE):
+        self.table = table
+        self.set_sql = set_sql
+        self.where_sql = where_sql
+        self.batch_size = batch_size
+
+    def describe(self, dialect) -> str:
+        return "UPDATE %s SET %s WHERE %s (in batches of %d ids)" % (
+            self.table, self.set_sql, self.where_sql, self.batch_size
+        )
+
+    def needed(self, conn) -> bool:
+        if not inspect(conn).has_table(self.table):
+            return False
+        try:
+            return conn.execute(text("SELECT 1 FROM %s WHERE %s LIMIT 1" % (self.table, self.where_sql))).first() is not None
+        except DBAPIError:
+            # شرط به ستونی اشاره می‌کند که قدم قبلی همین مهاجرت هنوز اضافه نکرده است (در dry-run)
+            conn.rollback()
+            return True
+
+    def apply(self, engine):
+        with engine.connect() as conn:
+            low, high = conn.execute(text("SELECT MIN(id), MAX(id) FROM %s" % self.table)).one()
+        if low is None:
+            return
+        statement = text("UPDATE %s SET %s WHERE id >= :low AND id < :high AND (%s)" % (
+            self.table, self.set_sql, self.where_sql
+        ))
+        for start in range(low, high + 1, self.batch_size):
+            with engine.begin() as conn:
+                conn.execute(statement, {"low": start, "high": start + self.batch_size})
+
+
+class RunPython(Step):
+    """
+    اجرای یک تابع پایتون روی موتور (مثلاً بازسازی جدول‌های خلاصه).
+    تابع با مسیر نقطه‌دار داده می‌شود و فقط هنگام اجرا import می‌شود تا فهرست مهاجرت‌ها
+    به ماژول‌های برنامه وابسته نباشد.
+    """
+
+    def __init__(self, description: str, func: str, table: str = None):
+        self.description = description
+        self.func = func
+        self.table = table
+
+    def describe(self, dialect) -> str:
+        return "%s (%s)" % (self.description, self.func)
+
+    def needed(self, conn) -> bool:
+        return self.table is None or inspect(conn).has_table(self.table)
+
+    def apply(self, engine):
+        module, name = self.func.rsplit(".", 1)
+        getattr(importlib.import_module(module), name)(engine)
+
+
+class CreateFullTextIndex(Step):
+    """
+    ایجاد جدول FTS5 برای جستجوی متنی هتل‌ها (فقط SQLite) به همراه triggerهایی
+    که آن را با هر insert/update/delete روی جدول hotels همگام نگه می‌دارند.
+    """
+
+    def __init__(self, table: str, source: str, columns):
+        self.table = table
+        self.source = source
+        self.columns = list(columns)
+
+    def statements(self) -> list:
+        columns = ", ".join(self.columns)
+        new_values = ", ".join("coalesce(new.%s, '')" % column for column in self.columns)
+        assignments = ", ".join("%s = coalesce(new.%s, '')" % (column, column) for column in self.columns)
+        source_values = ", ".join("coalesce(%s, '')" % column for column in self.columns)
+        return [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5(%s, tokenize='unicode61')" % (self.table, columns),
+            "CREATE TRIGGER IF NOT EXISTS %s_ai AFTER INSERT ON %s BEGIN "
+            "INSERT INTO %s (rowid, %s) VALUES (new.id, %s); END"
+            % (self.table, self.source, self.table, columns, new_values),
+            "CREATE TRIGGER IF NOT EXISTS %s_ad AFTER DELETE ON %s BEGIN "
+            "DELETE FROM %s WHERE rowid = old.id; END" % (self.table, self.source, self.table),
+            "CREATE TRIGGER IF NOT EXISTS %s_au AFTER UPDATE OF %s ON %s BEGIN "
+            "UPDATE %s SET %s WHERE rowid = old.id; END"
+            % (self.table, columns, self.source, self.table, assignments),
+            "INSERT INTO %s (rowid, %s) SELECT id, %s FROM %s" % (self.table, columns, source_values, self.source),
+        ]
+
+    def describe(self, dialect) -> str:
+        if dialect != "sqlite":
+            return "full-text table %s is SQLite only; search uses the in-process index" % self.table
+        return "; ".join(self.statements())
+
+    def needed(self, conn) -> bool:
+        if conn.dialect.name != "sqlite":
+            return False
+        inspector = inspect(conn)
+        return inspector.has_table(self.source) and not inspector.has_table(self.table)
+
+    def apply(self, engine):
+        with engine.begin() as conn:
+            for statement in self.statements():
+                conn.exec_driver_sql(statement)
+
+
+class Migration:
+    def __init__(self, version: int, description: str, steps):
+        self.version = version
+        self.description = description
+        self.steps = list(steps)
+
+
+# محاسبه دوباره خلاصه امتیاز هتل‌ها از روی جدول reviews (مهاجرت 4 و دستور booking.ratings)
+RATING_AGGREGATES_SQL = ", ".join(
+    ["review_count = (SELECT COUNT(*) FROM reviews WHERE reviews.hotel_id = hotels.id)",
+     "rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.hotel_id = hotels.id)"]
+    + ["rating_%d = (SELECT COUNT(*) FROM reviews WHERE reviews.hotel_id = hotels.id AND rating = %d)" % (n, n)
+       for n in range(1, 6)]
+)
+
+# قیمت و جمع درصد تخفیف‌های هر رزرو (مهاجرت 7)
+BOOKING_PRICE_SQL = (
+    "price_per_night = (SELECT price_per_night FROM hotels WHERE hotels.id = bookings.hotel_id), "
+    "discount_percentage = (SELECT COALESCE(SUM(discounts.discount_percentage), 0) FROM booking_discounts "
+    "JOIN discounts ON discounts.id = booking_discounts.discount_id WHERE booking_discounts.booking_id = bookings.id)"
+)
+
+# فهرست مهاجرت‌ها به ترتیب نسخه؛ نسخه‌های قبلی هرگز تغییر نمی‌کنند
+MIGRATIONS = [
+    Migration(1, "booking overlap and hot-filter indexes", [
+        CreateIndex("bookings", "ix_bookings_hotel_dates", ["hotel_id", "check_in_date", "check_out_date", "status"]),
+        CreateIndex("bookings", "ix_bookings_user_id", ["user_id"]),
+        CreateIndex("hotels", "ix_hotels_user_id", ["user_id"]),
+        CreateIndex("hotels", "ix_hotels_price_per_night", ["price_per_night"]),
+        CreateIndex("users", "ix_users_role", ["role"]),
+        CreateIndex("notifications", "ix_notifications_user_id", ["user_id"]),
+        CreateIndex("support_tickets", "ix_support_tickets_user_id", ["user_id"]),
+    ]),
+    Migration(2, "unique reviews, wishlist entries and wallets", [
+        ExecuteSQL(
+            "remove duplicate reviews",
+            "DELETE FROM reviews WHERE id NOT IN "
+            "(SELECT id FROM (SELECT MIN(id) AS id FROM reviews GROUP BY hotel_id, user_id) AS keep)",
+            table="reviews",
+        ),
+        ExecuteSQL(
+            "remove duplicate wishlist entries",
+            "DELETE FROM wishlist WHERE id NOT IN "
+            "(SELECT id FROM (SELECT MIN(id) AS id FROM wishlist GROUP BY user_id, hotel_id) AS keep)",
+            table="wishlist",
+        ),
+        ExecuteSQL(
+            "merge duplicate wallets into the oldest one",
+            "UPDATE wallet SET points = (SELECT total FROM (SELECT user_id, SUM(points) AS total FROM wallet "
+            "GROUP BY user_id) AS sums WHERE sums.user_id = wallet.user_id) "
+            "WHERE id IN (SELECT id FROM (SELECT MIN(id) AS id FROM wallet GROUP BY user_id HAVING COUNT(*) > 1) AS dup)",
+            table="wallet",
+        ),
+        ExecuteSQL(
+            "remove merged wallets",
+            "DELETE FROM wallet WHERE id NOT IN "
+            "(SELECT id FROM (SELECT MIN(id) AS id FROM wallet GROUP BY user_id) AS keep)",
+            table="wallet",
+        ),
+        CreateIndex("reviews", "uq_reviews_hotel_user", ["hotel_id", "user_id"], unique=True),
+        CreateIndex("wishlist", "uq_wishlist_user_hotel", ["user_id", "hotel_id"], unique=True),
+        CreateIndex("wallet", "uq_wallet_user_id", ["user_id"], unique=True),
+    ]),
+    Migration(3, "full-text search over hotel name, location and description", [
+        CreateFullTextIndex("hotels_fts", "hotels", ["name", "location", "description"]),
+    ]),
+    Migration(4, "precomputed hotel rating aggregates", [
+        AddColumn("hotels", "review_count", "INTEGER NOT NULL DEFAULT 0"),
+        AddColumn("hotels", "rating_sum", "INTEGER NOT NULL DEFAULT 0"),
+    ] + [
+        AddColumn("hotels", "rating_%d" % n, "INTEGER NOT NULL DEFAULT 0") for n in range(1, 6)
+    ] + [
+        Backfill("hotels", RATING_AGGREGATES_SQL),
+    ]),
+    Migration(5, "append-only wallet ledger and balance snapshots", [
+        CreateTable(WalletLedger.__table__),
+        CreateTable(WalletSnapshot.__table__),
+        ExecuteSQL(
+            "opening snapshot of existing wallet balances",
+            "INSERT INTO wallet_snapshots (user_id, balance, ledger_id, created_at) "
+            "SELECT user_id, COALESCE(points, 0), 0, CURRENT_TIMESTAMP FROM wallet "
+            "WHERE user_id NOT IN (SELECT user_id FROM wallet_snapshots)",
+            table="wallet",
+        ),
+    ]),
+    Migration(6, "daily occupancy and revenue rollups per hotel", [
+        CreateTable(HotelDailyStats.__table__),
+    ]),
+    Migration(7, "per-night price and discount captured on each booking", [
+        AddColumn("bookings", "price_per_night", "FLOAT"),
+        AddColumn("bookings", "discount_percentage", "FLOAT NOT NULL DEFAULT 0"),
+        # برای رزروهای قدیمی قیمت زمان رزرو در دسترس نیست و قیمت فعلی هتل جایگزین آن می‌شود
+        Backfill("bookings", BOOKING_PRICE_SQL, where_sql="price_per_night IS NULL"),
+        RunPython("build the rollups from existing bookings", "booking.rollups.rebuild", table="bookings"),
+    ]),
+]
+
+
+def _ensure_version_table(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS %s (version INTEGER PRIMARY KEY, description VARCHAR(255), applied_at TIMESTAMP)"
+            % VERSION_TABLE
+        )
+
+
+def current_version(engine) -> int:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(VERSION_TABLE):
+            return 0
+        return conn.execute(text("SELECT MAX(version) FROM %s" % VERSION_TABLE)).scalar() or 0
+
+
+def pending(engine):
+    version = current_version(engine)
+    return [migration for migration in MIGRATIONS if migration.version > version]
+
+
+def plan(engine) -> list:
+    """برنامه اجرای مهاجرت‌های باقیمانده را بدون تغییر دیتابیس برمی‌گرداند."""
+    lines = []
+    with engine.connect() as conn:
+        for migration in pending(engine):
+            lines.append("-- %d: %s" % (migration.version, migration.description))
+            for step in migration.steps:
+                prefix = "   " if step.needed(conn) else "   (skip, already applied) "
+                lines.append(prefix + step.describe(engine.dialect.name))
+    return lines
+
+
+def upgrade(engine, dry_run: bool = False):
+    """مهاجرت‌های باقیمانده را به ترتیب اجرا می‌کند؛ با dry_run فقط برنامه را چاپ می‌کند."""
+    if dry_run:
+        for line in plan(engine):
+            print(line)
+        return
+    _ensure_version_table(engine)
+    for migration in pending(engine):
+        print("Applying migration %d: %s" % (migration.version, migration.description))
+        for step in migration.steps:
+            with engine.connect() as conn:
+                needed = step.needed(conn)
+            if needed:
+                step.apply(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO %s (version, description, applied_at) VALUES (:version, :description, :applied_at)"
+                     % VERSION_TABLE),
+                {"version": migration.version, "description": migration.description, "applied_at": datetime.utcnow()},
+            )
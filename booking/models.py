@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from booking.database import Base
 from datetime import datetime
 
+# هیچ رابطه‌ای بی‌صدا بارگذاری تنبل نمی‌شود: دسترسی به رابطه‌ای که با selectinload/joinedload
+# بارگذاری نشده و در identity map هم نیست خطا می‌دهد تا کوئری N+1 در مسیرها پنهان نماند
+LAZY = "raise_on_sql"
+
 # مدل User
 class User(Base):
     __tablename__ = 'users'
@@ -18,13 +22,17 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    hotels = relationship("Hotel", back_populates="manager")
-    bookings = relationship("Booking", back_populates="user")
-    reviews = relationship("Review", back_populates="user")
-    support_tickets = relationship("SupportTicket", back_populates="user")
-    wallet = relationship("Wallet", back_populates="user", uselist=False)
-    wishlist = relationship("Wishlist", back_populates="user")
-    notifications = relationship("Notification", back_populates="user")
+    hotels = relationship("Hotel", back_populates="manager", lazy=LAZY)
+    bookings = relationship("Booking", back_populates="user", lazy=LAZY)
+    reviews = relationship("Review", back_populates="user", lazy=LAZY)
+    support_tickets = relationship("SupportTicket", back_populates="user", lazy=LAZY)
+    wallet = relationship("Wallet", back_populates="user", uselist=False, lazy=LAZY)
+    wishlist = relationship("Wishlist", back_populates="user", lazy=LAZY)
+    notifications = relationship("Notification", back_populates="user", lazy=LAZY)
+
+    __table_args__ = (
+        Index("ix_users_role", "role"),
+    )
 
 # مدل Hotel
 class Hotel(Base):
@@ -37,13 +45,36 @@ class Hotel(Base):
     has_wifi = Column(Boolean, default=True)
     price_per_night = Column(Float)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    # خلاصه امتیازها که با هر ثبت یا حذف نظر به صورت افزایشی به‌روز می‌شود
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5 = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    manager = relationship("User", back_populates="hotels")
-    bookings = relationship("Booking", back_populates="hotel")
-    reviews = relationship("Review", back_populates="hotel")
-    wishlist_entries = relationship("Wishlist", back_populates="hotel")
+    manager = relationship("User", back_populates="hotels", lazy=LAZY)
+    bookings = relationship("Booking", back_populates="hotel", lazy=LAZY)
+    reviews = relationship("Review", back_populates="hotel", lazy=LAZY)
+    wishlist_entries = relationship("Wishlist", back_populates="hotel", lazy=LAZY)
+
+    __table_args__ = (
+        Index("ix_hotels_user_id", "user_id"),
+        Index("ix_hotels_price_per_night", "price_per_night"),
+    )
+
+    @property
+    def average_rating(self):
+        if not self.review_count:
+            return None
+        return round(self.rating_sum / self.review_count, 2)
+
+    @property
+    def rating_histogram(self):
+        return [self.rating_1 or 0, self.rating_2 or 0, self.rating_3 or 0, self.rating_4 or 0, self.rating_5 or 0]
 
 # مدل Booking
 
@@ -56,13 +87,22 @@ class Booking(Base):
     check_in_date = Column(Date, nullable=False)
     check_out_date = Column(Date, nullable=False)
     status = Column(String, default="Pending")  # Pending, Confirmed, Cancelled
+    # قیمت هر شب و جمع درصد تخفیف‌ها در زمان رزرو؛ خلاصه‌های روزانه با همین مقادیر محاسبه می‌شوند
+    price_per_night = Column(Float)
+    discount_percentage = Column(Float, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    user = relationship("User", back_populates="bookings")
-    hotel = relationship("Hotel", back_populates="bookings")
-    discounts = relationship("BookingDiscount", back_populates="booking")
-    notifications = relationship("Notification", back_populates="booking")  # اضافه کردن این خط برای حل مشکل
+    user = relationship("User", back_populates="bookings", lazy=LAZY)
+    hotel = relationship("Hotel", back_populates="bookings", lazy=LAZY)
+    discounts = relationship("BookingDiscount", back_populates="booking", lazy=LAZY)
+    notifications = relationship("Notification", back_populates="booking", lazy=LAZY)  # اضافه کردن این خط برای حل مشکل
+
+    __table_args__ = (
+        # ایندکس پوششی برای بررسی هم‌پوشانی تاریخ‌ها بدون اسکن همه رزروهای هتل
+        Index("ix_bookings_hotel_dates", "hotel_id", "check_in_date", "check_out_date", "status"),
+        Index("ix_bookings_user_id", "user_id"),
+    )
 
 # مدل Review
 class Review(Base):
@@ -76,8 +116,13 @@ class Review(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    user = relationship("User", back_populates="reviews")
-    hotel = relationship("Hotel", back_populates="reviews")
+    user = relationship("User", back_populates="reviews", lazy=LAZY)
+    hotel = relationship("Hotel", back_populates="reviews", lazy=LAZY)
+
+    __table_args__ = (
+        # هر کاربر فقط یک نظر برای هر هتل؛ ایندکس آن فیلتر hotel_id را هم پوشش می‌دهد
+        UniqueConstraint("hotel_id", "user_id", name="uq_reviews_hotel_user"),
+    )
 
 # مدل SupportTicket
 class SupportTicket(Base):
@@ -91,7 +136,11 @@ class SupportTicket(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    user = relationship("User", back_populates="support_tickets")
+    user = relationship("User", back_populates="support_tickets", lazy=LAZY)
+
+    __table_args__ = (
+        Index("ix_support_tickets_user_id", "user_id"),
+    )
 
 # مدل Wallet
 class Wallet(Base):
@@ -102,7 +151,54 @@ class Wallet(Base):
     points = Column(Float, default=0.0)
     last_updated = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User", back_populates="wallet")
+    user = relationship("User", back_populates="wallet", lazy=LAZY)
+
+    __table_args__ = (
+        # هر کاربر فقط یک کیف پول دارد
+        UniqueConstraint("user_id", name="uq_wallet_user_id"),
+    )
+
+# دفتر تراکنش‌های کیف پول؛ فقط اضافه می‌شود و هرگز ویرایش نمی‌شود
+class WalletLedger(Base):
+    __tablename__ = 'wallet_ledger'
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    amount = Column(Float, nullable=False)  # مثبت برای افزایش و منفی برای برداشت
+    reason = Column(String, nullable=False)  # add_points, redeem_points, booking_bonus
+    booking_id = Column(Integer, ForeignKey('bookings.id'), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_wallet_ledger_user_id", "user_id", "id"),
+    )
+
+# موجودی کیف پول‌ها در یک لحظه؛ موجودی هر کاربر = آخرین snapshot + تراکنش‌های بعد از ledger_id آن
+class WalletSnapshot(Base):
+    __tablename__ = 'wallet_snapshots'
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    balance = Column(Float, nullable=False)
+    ledger_id = Column(Integer, nullable=False, default=0)  # آخرین تراکنش لحاظ‌شده در balance
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_wallet_snapshots_user_id", "user_id", "ledger_id"),
+    )
+
+# خلاصه روزانه رزروهای هر هتل؛ هر رزرو در هر شب اقامت خود (check_in <= day < check_out) شمرده می‌شود
+# و با هر تغییر رزرو به صورت افزایشی به‌روز می‌شود (booking.rollups)
+class HotelDailyStats(Base):
+    __tablename__ = 'hotel_daily_stats'
+
+    hotel_id = Column(Integer, ForeignKey('hotels.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    nights_booked = Column(Integer, nullable=False, default=0, server_default="0")  # رزروهای لغونشده
+    confirmed_nights = Column(Integer, nullable=False, default=0, server_default="0")
+    cancelled_nights = Column(Integer, nullable=False, default=0, server_default="0")
+    revenue = Column(Float, nullable=False, default=0, server_default="0")  # جمع price_per_night شب‌های لغونشده
+    discount = Column(Float, nullable=False, default=0, server_default="0")  # مبلغ تخفیف اعمال‌شده روی همان شب‌ها
 
 # مدل Wishlist
 class Wishlist(Base):
@@ -113,8 +209,12 @@ class Wishlist(Base):
     hotel_id = Column(Integer, ForeignKey('hotels.id'), nullable=False)
     added_at = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User", back_populates="wishlist")
-    hotel = relationship("Hotel", back_populates="wishlist_entries")
+    user = relationship("User", back_populates="wishlist", lazy=LAZY)
+    hotel = relationship("Hotel", back_populates="wishlist_entries", lazy=LAZY)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "hotel_id", name="uq_wishlist_user_hotel"),
+    )
 
 # مدل Discount
 class Discount(Base):
@@ -136,8 +236,8 @@ class BookingDiscount(Base):
     booking_id = Column(Integer, ForeignKey('bookings.id'), primary_key=True)
     discount_id = Column(Integer, ForeignKey('discounts.id'), primary_key=True)
 
-    booking = relationship("Booking", back_populates="discounts")
-    discount = relationship("Discount")
+    booking = relationship("Booking", back_populates="discounts", lazy=LAZY)
+    discount = relationship("Discount", lazy=LAZY)
 
 # مدل Notification
 class Notification(Base):
@@ -151,5 +251,9 @@ class Notification(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     read_status = Column(Boolean, default=False)
 
-    user = relationship("User", back_populates="notifications")
-    booking = relationship("Booking", back_populates="notifications", uselist=False)
\ No newline at end of file
+    user = relationship("User", back_populates="notifications", lazy=LAZY)
+    booking = relationship("Booking", back_populates="notifications", uselist=False, lazy=LAZY)
+
+    __table_args__ = (
+        Index("ix_notifications_user_id", "user_id"),
+    )
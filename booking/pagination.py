@@ -0,0 +1,95 @@
+import json
+from typing import Optional
+
+from fastapi import Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from booking.database import read_session_factory
+
+# تنظیمات صفحه‌بندی
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """پارامترهای مشترک صفحه‌بندی keyset و حالت استریم NDJSON."""
+
+    def __init__(
+        self,
+        request: Request,
+        cursor: Optional[int] = Query(None, description="Return rows after this id (value of X-Next-Cursor)"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        stream: bool = Query(False, description="Stream every row as NDJSON instead of a single page")
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.stream = stream
+        # session استریم مانند session درخواست با قاعده read-your-writes انتخاب می‌شود
+        self.session_factory = read_session_factory(request)
+
+
+def from_model(model):
+    """تابعی برمی‌گرداند که یک ردیف ORM را با مدل Pydantic داده‌شده به dict تبدیل می‌کند."""
+    def serialize(row):
+        return model.model_validate(row, from_attributes=True).model_dump(mode="json")
+    return serialize
+
+
+def _json_default(value):
+    # تاریخ‌ها با همان قالب ISO پاسخ‌های عادی FastAPI سریال می‌شوند
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def keyset_page(query, column, page: PageParams, response: Response):
+    """
+    یک صفحه از نتایج را بر اساس ستون کلید (معمولاً id) برمی‌گرداند.
+    اگر صفحه بعدی وجود داشته باشد، مقدار cursor آن در هدر X-Next-Cursor قرار می‌گیرد.
+    """
+    if page.cursor is not None:
+        query = query.filter(column > page.cursor)
+    rows = query.order_by(column).limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(getattr(rows[-1], column.key))
+    return rows
+
+
+async def async_keyset_page(db, stmt, column, page: PageParams, response: Response):
+    """نسخه async تابع keyset_page برای AsyncSession و دستور select."""
+    if page.cursor is not None:
+        stmt = stmt.where(column > page.cursor)
+    rows = (await db.scalars(stmt.order_by(column).limit(page.limit + 1))).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(getattr(rows[-1], column.key))
+    return rows
+
+
+def stream_ndjson(build_query, column, page: PageParams, serialize):
+    """
+    همه ردیف‌ها را به صورت NDJSON استریم می‌کند.
+    کوئری با یک session جداگانه و yield_per خوانده می‌شود تا مصرف حافظه ثابت بماند.
+    """
+    def generate():
+        db = page.session_factory()
+        try:
+            query = build_query(db)
+            if page.cursor is not None:
+                query = query.filter(column > page.cursor)
+            for row in query.order_by(column).yield_per(STREAM_BATCH_SIZE):
+                yield json.dumps(serialize(row), default=_json_default) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+def paginate(db, build_query, column, page: PageParams, response: Response, serialize):
+    """بسته به پارامترها یک صفحه از نتایج یا پاسخ استریم NDJSON برمی‌گرداند."""
+    if page.stream:
+        return stream_ndjson(build_query, column, page, serialize)
+    return keyset_page(build_query(db), column, page, response)
@@ -0,0 +1,50 @@
+import argparse
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from booking.database import engine
+from booking.migrations import RATING_AGGREGATES_SQL, Backfill
+from booking.models import Hotel
+
+# هتل‌هایی که خلاصه امتیازشان با جدول reviews همخوانی ندارد
+DRIFT_SQL = (
+    "SELECT COUNT(*) FROM hotels WHERE "
+    "review_count != (SELECT COUNT(*) FROM reviews WHERE reviews.hotel_id = hotels.id) OR "
+    "rating_sum != (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.hotel_id = hotels.id)"
+)
+
+
+def apply_review(db: Session, hotel_id: int, rating: int, delta: int):
+    """
+    خلاصه امتیاز هتل را در همان تراکنش ثبت یا حذف نظر به‌روز می‌کند (delta برابر 1 یا -1).
+    به‌روزرسانی به صورت UPDATE نسبی در SQL انجام می‌شود تا درخواست‌های همزمان همدیگر را بازنویسی نکنند.
+    """
+    values = {
+        Hotel.review_count: Hotel.review_count + delta,
+        Hotel.rating_sum: Hotel.rating_sum + delta * rating,
+    }
+    if 1 <= rating <= 5:
+        column = getattr(Hotel, "rating_%d" % rating)
+        values[column] = column + delta
+    db.query(Hotel).filter(Hotel.id == hotel_id).update(values, synchronize_session=False)
+
+
+def drifted_hotels(bind=engine) -> int:
+    with bind.connect() as conn:
+        return conn.execute(text(DRIFT_SQL)).scalar()
+
+
+def rebuild(bind=engine):
+    """خلاصه امتیاز همه هتل‌ها را به صورت دسته‌ای از روی reviews بازسازی می‌کند."""
+    Backfill("hotels", RATING_AGGREGATES_SQL).apply(bind)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or rebuild the precomputed hotel rating aggregates")
+    parser.add_argument("--check", action="store_true", help="only report how many hotels have drifted")
+    args = parser.parse_args()
+    print("%d hotels have drifted rating aggregates" % drifted_hotels())
+    if not args.check:
+        rebuild()
+        print("Rating aggregates rebuilt; running workers pick them up within CATALOG_TTL seconds")
@@ -0,0 +1,146 @@
+"""
+خلاصه روزانه رزروهای هر هتل (hotel_daily_stats) برای گزارش اشغال و درآمد.
+هر تغییر رزرو با upsert نسبی (ستون = ستون + تغییر) در همان تراکنش اعمال می‌شود.
+
+بازسازی کامل از روی جدول bookings یا فقط بررسی همخوانی:
+    python -m booking.rollups
+    python -m booking.rollups --check
+"""
+import argparse
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from booking.availability import CANCELLED
+from booking.database import engine
+from booking.models import Booking, HotelDailyStats
+from booking.upsert import update_or_insert, upsert_statement
+
+CONFIRMED = "Confirmed"
+ROLLUP_FIELDS = ("nights_booked", "confirmed_nights", "cancelled_nights", "revenue", "discount")
+UPSERT_CHUNK_SIZE = 500
+
+# وضعیت یک رزرو از دید خلاصه‌ها؛ price و discount_percentage همان مقادیر ذخیره‌شده روی رزرو هستند
+# تا تغییر بعدی قیمت هتل سهم قبلی رزرو را تغییر ندهد
+BookingState = namedtuple(
+    "BookingState", ["hotel_id", "check_in_date", "check_out_date", "status", "price", "discount_percentage"]
+)
+STATE_COLUMNS = (Booking.hotel_id, Booking.check_in_date, Booking.check_out_date, Booking.status,
+                 Booking.price_per_night, Booking.discount_percentage)
+
+
+def booking_state(db: Session, booking_id: int):
+    """وضعیت ذخیره‌شده رزرو را می‌خواند؛ باید پیش از تغییر رزرو صدا زده شود."""
+    row = db.execute(select(*STATE_COLUMNS).where(Booking.id == booking_id)).first()
+    return BookingState(*row) if row is not None else None
+
+
+def add_deltas(deltas: dict, state: BookingState, sign: int = 1) -> dict:
+    """سهم هر شب رزرو را با علامت sign به deltas ({(hotel_id, day): [مقادیر ROLLUP_FIELDS]}) اضافه می‌کند."""
+    if state is None:
+        return deltas
+    cancelled = state.status == CANCELLED
+    price = 0 if cancelled else (state.price or 0)
+    discount = price * min(state.discount_percentage or 0, 100) / 100
+    values = (0 if cancelled else sign, sign if state.status == CONFIRMED else 0, sign if cancelled else 0,
+              sign * price, sign * discount)
+    day = state.check_in_date
+    while day < state.check_out_date:
+        current = deltas.get((state.hotel_id, day))
+        if current is None:
+            deltas[(state.hotel_id, day)] = list(values)
+        else:
+            for i, value in enumerate(values):
+                current[i] += value
+        day += timedelta(days=1)
+    return deltas
+
+
+def _upsert(db: Session, rows: list):
+    """upsert چندردیفی که مقادیر را به ردیف موجود اضافه می‌کند؛ برای دیتابیس‌های دیگر None برمی‌گرداند."""
+    return upsert_statement(
+        db, HotelDailyStats, rows, [HotelDailyStats.hotel_id, HotelDailyStats.day],
+        lambda new: {field: getattr(HotelDailyStats, field) + new[field] for field in ROLLUP_FIELDS}
+    )
+
+
+def _add_row(db: Session, row: dict):
+    key = (HotelDailyStats.hotel_id == row["hotel_id"], HotelDailyStats.day == row["day"])
+    statement = update(HotelDailyStats).where(*key).values(
+        {field: getattr(HotelDailyStats, field) + row[field] for field in ROLLUP_FIELDS}
+    )
+    update_or_insert(db, lambda: db.execute(statement).rowcount or None, insert(HotelDailyStats).values(row))
+
+
+def apply_deltas(db: Session, deltas: dict):
+    """تغییرات را در دسته‌های UPSERT_CHUNK_SIZE تایی اعمال می‌کند؛ commit بر عهده فراخواننده است."""
+    rows = [
+        dict(zip(("hotel_id", "day") + ROLLUP_FIELDS, key + tuple(values)))
+        for key, values in deltas.items() if any(values)
+    ]
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+        statement = _upsert(db, chunk)
+        if statement is not None:
+            db.execute(statement)
+        else:
+            for row in chunk:
+                _add_row(db, row)
+
+
+def record_change(db: Session, before: BookingState = None, after: BookingState = None):
+    """
+    خلاصه‌ها را در همان تراکنش تغییر رزرو به‌روز می‌کند: سهم وضعیت قبلی کم و سهم وضعیت جدید اضافه می‌شود.
+    برای رزرو جدید before و برای رزرو حذف‌شده after برابر None است.
+    """
+    apply_deltas(db, add_deltas(add_deltas({}, before, -1), after, 1))
+
+
+def delete_hotel_rollups(db: Session, hotel_id: int):
+    """خلاصه‌های یک هتل را پیش از حذف آن در همان تراکنش پاک می‌کند (کلید خارجی hotel_id)."""
+    db.execute(delete(HotelDailyStats).where(HotelDailyStats.hotel_id == hotel_id))
+
+
+def compute(db: Session) -> dict:
+    """خلاصه‌ها را از روی همه رزروها محاسبه می‌کند (رزروها به صورت دسته‌ای خوانده می‌شوند)."""
+    deltas = {}
+    for row in db.execute(select(*STATE_COLUMNS), execution_options={"yield_per": 1000}):
+        add_deltas(deltas, BookingState(*row))
+    return deltas
+
+
+def rebuild(bind=engine):
+    """جدول خلاصه‌ها را در یک تراکنش از نو می‌سازد تا داشبوردها هیچ‌وقت جدول نیمه‌پر نبینند."""
+    # تراکنش هم می‌خواند و هم می‌نویسد، پس در SQLite از ابتدا قفل نوشتن را می‌گیرد
+    with Session(bind.execution_options(sqlite_begin="IMMEDIATE")) as db:
+        deltas = compute(db)
+        db.execute(delete(HotelDailyStats))
+        apply_deltas(db, deltas)
+        db.commit()
+
+
+def drifted_days(bind=engine) -> int:
+    """تعداد روزهایی (هتل و روز) که خلاصه ذخیره‌شده با محاسبه از روی bookings همخوانی ندارد."""
+    with Session(bind) as db:
+        expected = compute(db)
+        stored = {
+            (row.hotel_id, row.day): [getattr(row, field) for field in ROLLUP_FIELDS]
+            for row in db.scalars(select(HotelDailyStats))
+        }
+    zero = [0] * len(ROLLUP_FIELDS)
+    return sum(
+        1 for key in set(expected) | set(stored)
+        if any(abs(a - b) > 1e-6 for a, b in zip(expected.get(key, zero), stored.get(key, zero)))
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or rebuild the daily hotel booking rollups")
+    parser.add_argument("--check", action="store_true", help="only report how many hotel-days have drifted")
+    args = parser.parse_args()
+    print("%d hotel-days have drifted from the bookings table" % drifted_days())
+    if not args.check:
+        rebuild()
+        print("Daily rollups rebuilt")
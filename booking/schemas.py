@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
 # مدل User برای ایجاد کاربر جدید
@@ -53,6 +53,11 @@ class HotelResponse(BaseModel):
     description: Optional[str] = None
     has_wifi: bool
     price_per_night: float
+    review_count: int = 0
+    rating_sum: int = 0
+    average_rating: Optional[float] = None
+    # تعداد نظرها با امتیاز 1 تا 5
+    rating_histogram: List[int] = [0, 0, 0, 0, 0]
 
     class Config:
         orm_mode = True
@@ -0,0 +1,180 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+import math
+import re
+import threading
+import unicodedata
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from booking.catalog import hotel_catalog, hotel_record
+from booking.models import Hotel
+
+# جدول FTS5 که در مهاجرت نسخه 3 ساخته می‌شود
+FTS_TABLE = "hotels_fts"
+# وزن هر ستون در رتبه‌بندی؛ تطابق در نام مهم‌تر از توضیحات است
+FIELD_WEIGHTS = {"name": 10.0, "location": 5.0, "description": 1.0}
+MAX_QUERY_TERMS = 8
+# پارامترهای استاندارد BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# مانند unicode61 فقط حروف و ارقام جزء کلمه‌اند
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(value: str) -> list:
+    """مانند tokenizer پیش‌فرض unicode61: حروف کوچک و بدون اعراب."""
+    if not value:
+        return []
+    value = unicodedata.normalize("NFKD", value.lower())
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return _TOKEN.findall(value)
+
+
+def match_expression(tokens: list) -> str:
+    """عبارت MATCH برای FTS5؛ هر کلمه به صورت پیشوندی و همه با AND."""
+    return " ".join('"%s"*' % token for token in tokens)
+
+
+class InvertedIndex:
+    """
+    ایندکس معکوس درون‌حافظه برای دیتابیس‌هایی که FTS5 ندارند.
+    واژه‌ها به صورت مرتب نگهداری می‌شوند تا جستجوی پیشوندی با bisect انجام شود
+    و امتیازدهی مانند bm25 در FTS5 است.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.terms = []
+        self.documents = {}
+        self.total_length = 0.0
+
+    def add(self, record: dict):
+        self.remove(record["id"])
+        frequencies = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(record.get(field)):
+                frequencies[token] += weight
+        for token, frequency in frequencies.items():
+            if token not in self.postings:
+                insort(self.terms, token)
+            self.postings[token][record["id"]] = frequency
+        length = sum(frequencies.values())
+        self.documents[record["id"]] = (length, list(frequencies))
+        self.total_length += length
+
+    def remove(self, hotel_id: int):
+        document = self.documents.pop(hotel_id, None)
+        if document is None:
+            return
+        length, tokens = document
+        self.total_length -= length
+        for token in tokens:
+            postings = self.postings[token]
+            postings.pop(hotel_id, None)
+            if not postings:
+                del self.postings[token]
+                del self.terms[bisect_left(self.terms, token)]
+
+    def expand(self, prefix: str) -> list:
+        start = bisect_left(self.terms, prefix)
+        end = start
+        while end < len(self.terms) and self.terms[end].startswith(prefix):
+            end += 1
+        return self.terms[start:end]
+
+    def search(self, tokens: list, limit: int) -> list:
+        if not tokens or not self.documents:
+            return []
+        count = len(self.documents)
+        average = self.total_length / count or 1.0
+        scores = None
+        for prefix in tokens:
+            matched = defaultdict(float)
+            for term in self.expand(prefix):
+                postings = self.postings[term]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for hotel_id, frequency in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.documents[hotel_id][0] / average)
+                    matched[hotel_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            # همه کلمات جستجو باید در نتیجه وجود داشته باشند
+            if scores is None:
+                scores = matched
+            else:
+                scores = {hotel_id: score + matched[hotel_id] for hotel_id, score in scores.items() if hotel_id in matched}
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [hotel_id for hotel_id, _ in ranked[:limit]]
+
+
+class HotelSearch:
+    """
+    جستجوی متنی هتل‌ها: در SQLite از جدول FTS5 (که با trigger به‌روز می‌ماند)
+    و در سایر دیتابیس‌ها از ایندکس معکوس درون‌حافظه استفاده می‌کند.
+    """
+
+    def __init__(self):
+        self._fts = None
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def uses_fts(self, db: Session) -> bool:
+        if self._fts is None:
+            bind = db.get_bind()
+            self._fts = bind.dialect.name == "sqlite" and inspect(bind).has_table(FTS_TABLE)
+        return self._fts
+
+    def _fts_search(self, db: Session, tokens: list, limit: int) -> list:
+        weights = ", ".join(str(weight) for weight in FIELD_WEIGHTS.values())
+        rows = db.execute(
+            text("SELECT rowid FROM %s WHERE %s MATCH :query ORDER BY bm25(%s, %s), rowid LIMIT :limit"
+                 % (FTS_TABLE, FTS_TABLE, FTS_TABLE, weights)),
+            {"query": match_expression(tokens), "limit": limit}
+        )
+        return [row[0] for row in rows]
+
+    def _load(self, db: Session) -> InvertedIndex:
+        # ایندکس از روی کاتالوگ کش‌شده ساخته می‌شود و کوئری جداگانه‌ای لازم ندارد؛ هر بار که
+        # کاتالوگ از دیتابیس دوباره بارگذاری شود (مثلاً پس از نوشتن در پروسه دیگر) از نو ساخته می‌شود
+        records = hotel_catalog.snapshot(db).records
+        version = hotel_catalog.version
+        with self._lock:
+            if self._index is None or self._version != version:
+                index = InvertedIndex()
+                for record in records:
+                    index.add(record)
+                self._index = index
+                self._version = version
+            return self._index
+
+    def search(self, db: Session, query: str, limit: int) -> list:
+        """رکوردهای هتل منطبق با query را به ترتیب رتبه برمی‌گرداند."""
+        tokens = tokenize(query)[:MAX_QUERY_TERMS]
+        if not tokens:
+            return []
+        if self.uses_fts(db):
+            ids = self._fts_search(db, tokens, limit)
+        else:
+            index = self._load(db)
+            with self._lock:
+                ids = index.search(tokens, limit)
+        snapshot = hotel_catalog.snapshot(db)
+        return [record for record in map(snapshot.get, ids) if record is not None]
+
+    def upsert(self, hotel: Hotel):
+        """هتل ایجاد یا ویرایش‌شده را در ایندکس درون‌حافظه می‌نویسد؛ FTS5 با trigger به‌روز می‌شود."""
+        with self._lock:
+            if self._index is not None:
+                self._index.add(hotel_record(hotel))
+
+    def remove(self, hotel_id: int):
+        with self._lock:
+            if self._index is not None:
+                self._index.remove(hotel_id)
+
+
+hotel_search = HotelSearch()
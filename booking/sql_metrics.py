@@ -0,0 +1,132 @@
+from contextvars import ContextVar
+import json
+import logging
+import time
+
+from sqlalchemy import event
+
+from booking.config import SLOW_QUERY_MS, SQL_STATEMENT_LIMIT
+from booking.database import async_engine, async_read_engine, engine, read_engine
+
+# شمارنده دستورهای SQL درخواست جاری؛ خارج از درخواست HTTP مقدار آن None است
+_current = ContextVar("sql_statements", default=None)
+
+# دستورهای کندتر از SLOW_QUERY_MS به صورت یک خط JSON در این logger نوشته می‌شوند
+slow_query_log = logging.getLogger("booking.slow_query")
+MAX_LOGGED_STATEMENT = 2000
+
+
+class SQLStatementLimitExceeded(RuntimeError):
+    """درخواستی بیش از SQL_STATEMENT_LIMIT دستور SQL اجرا کرده است (معمولاً نشانه N+1)."""
+
+
+class StatementCounter:
+    """آمار دستورهای SQL یک درخواست: تعداد، زمان کل و کندترین دستور."""
+
+    __slots__ = ("scope", "count", "limit", "total_time", "slowest_time", "slowest_statement")
+
+    def __init__(self, scope: dict, limit: int = SQL_STATEMENT_LIMIT):
+        self.scope = scope
+        self.count = 0
+        self.limit = limit
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+    @property
+    def route(self) -> str:
+        # Router پس از تطبیق مسیر، route را در همین scope قرار می‌دهد
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope["path"]
+
+    def record(self, statement: str, elapsed: float):
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def server_timing(self) -> bytes:
+        """مقدار هدر Server-Timing (زمان‌ها به میلی‌ثانیه)."""
+        return ('db;dur=%.2f;desc="%d statements", db-slowest;dur=%.2f' % (
+            self.total_time * 1000, self.count, self.slowest_time * 1000
+        )).encode()
+
+
+def current_counter():
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is None:
+        return
+    counter.count += 1
+    if counter.limit and counter.count > counter.limit:
+        raise SQLStatementLimitExceeded(
+            "%s issued more than %d SQL statements; last one: %s" % (counter.route, counter.limit, statement)
+        )
+    if context is not None:
+        context._sql_metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    start = getattr(context, "_sql_metrics_start", None)
+    if counter is None or start is None:
+        return
+    elapsed = time.perf_counter() - start
+    counter.record(statement, elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_query_log.warning(json.dumps({
+            "event": "slow_query",
+            "method": counter.scope.get("method"),
+            "route": counter.route,
+            "path": counter.scope["path"],
+            "duration_ms": round(elapsed * 1000, 2),
+            "executemany": executemany,
+            "statement": " ".join(statement.split())[:MAX_LOGGED_STATEMENT],
+        }, ensure_ascii=False))
+
+
+def instrument(bind):
+    """شمارش و زمان‌سنجی دستورهای SQL را روی یک موتور فعال می‌کند."""
+    if not event.contains(bind, "before_cursor_execute", _before_cursor_execute):
+        event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+        event.listen(bind, "after_cursor_execute", _after_cursor_execute)
+
+
+instrument(engine)
+instrument(read_engine)
+if async_engine is not None:
+    instrument(async_engine.sync_engine)
+if async_read_engine is not None:
+    instrument(async_read_engine.sync_engine)
+
+
+class SQLMetricsMiddleware:
+    """
+    برای هر درخواست HTTP آمار دستورهای SQL را جمع می‌کند و در هدر Server-Timing برمی‌گرداند.
+    با تنظیم SQL_STATEMENT_LIMIT (مثلاً در تست‌ها) درخواستی که بیش از این تعداد
+    دستور اجرا کند با SQLStatementLimitExceeded شکست می‌خورد.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        counter = StatementCounter(scope)
+        token = _current.set(counter)
+
+        async def send_wrapper(message):
+            # برای پاسخ‌های استریم فقط دستورهای قبل از شروع پاسخ در هدر می‌آیند
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"server-timing", counter.server_timing()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
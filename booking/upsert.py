@@ -0,0 +1,41 @@
+"""
+upsert مشترک (ایجاد ردیف یا افزودن به ردیف موجود) برای کیف پول و خلاصه‌های روزانه.
+"""
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+
+def upsert_statement(db: Session, table, values, index_elements, updates):
+    """
+    INSERT ... ON CONFLICT DO UPDATE (SQLite و PostgreSQL) یا ON DUPLICATE KEY UPDATE (MySQL).
+    updates تابعی است که ردیف پیشنهادی (excluded یا inserted) را می‌گیرد و dict ستون‌هایی را که
+    در صورت تکراری بودن کلید به‌روز می‌شوند برمی‌گرداند. برای دیتابیس‌های دیگر None برمی‌گرداند
+    تا فراخواننده از update_or_insert استفاده کند.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name in ("sqlite", "postgresql"):
+        module = sqlite if dialect.name == "sqlite" else postgresql
+        statement = module.insert(table).values(values)
+        return statement.on_conflict_do_update(index_elements=index_elements, set_=updates(statement.excluded))
+    if dialect.name == "mysql":
+        statement = mysql.insert(table).values(values)
+        return statement.on_duplicate_key_update(updates(statement.inserted))
+    return None
+
+
+def update_or_insert(db: Session, apply_update, insert_statement, inserted=None):
+    """
+    مسیر جایگزین upsert: apply_update (که اگر ردیفی تغییر نکند None برمی‌گرداند) اجرا و در صورت
+    نبودن ردیف، INSERT در یک savepoint انجام می‌شود. اگر درخواست همزمان دیگری ردیف را ساخته باشد
+    دوباره UPDATE می‌شود. نتیجه UPDATE یا در صورت INSERT مقدار inserted برگردانده می‌شود.
+    """
+    result = apply_update()
+    if result is not None:
+        return result
+    try:
+        with db.begin_nested():
+            db.execute(insert_statement)
+        return inserted
+    except IntegrityError:
+        return apply_update()
@@ -0,0 +1,133 @@
+"""
+عملیات کیف پول با افزایش و کاهش اتمی در SQL و ثبت در دفتر تراکنش‌ها.
+
+ساخت snapshot دوره‌ای موجودی‌ها و بررسی همخوانی آن‌ها با دفتر (مثلاً با cron):
+    python -m booking.wallet_ledger snapshot
+    python -m booking.wallet_ledger verify
+"""
+import argparse
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import insert, text, update
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session
+
+from booking.database import engine
+from booking.models import Wallet, WalletLedger
+from booking.upsert import update_or_insert, upsert_statement
+
+# مقدار امتیاز هدیه هر رزرو
+BOOKING_BONUS = 10
+
+# کاربرانی که موجودی کیف پولشان با آخرین snapshot به اضافه تراکنش‌های بعد از آن برابر نیست
+DRIFT_SQL = """
+SELECT wallet.user_id, wallet.points, COALESCE(snap.balance, 0) + COALESCE((
+    SELECT SUM(amount) FROM wallet_ledger
+    WHERE wallet_ledger.user_id = wallet.user_id AND wallet_ledger.id > COALESCE(snap.ledger_id, 0)
+), 0) AS expected
+FROM wallet
+LEFT JOIN wallet_snapshots AS snap ON snap.id = (
+    SELECT MAX(id) FROM wallet_snapshots WHERE wallet_snapshots.user_id = wallet.user_id
+)
+"""
+
+SNAPSHOT_SQL = """
+INSERT INTO wallet_snapshots (user_id, balance, ledger_id, created_at)
+SELECT wallet.user_id, COALESCE(wallet.points, 0), COALESCE((
+    SELECT MAX(id) FROM wallet_ledger WHERE wallet_ledger.user_id = wallet.user_id
+), 0), :now
+FROM wallet
+"""
+
+
+def _record(db: Session, user_id: int, amount: float, reason: str, booking_id: int = None):
+    db.execute(insert(WalletLedger).values(
+        user_id=user_id, amount=amount, reason=reason, booking_id=booking_id, created_at=datetime.utcnow()
+    ))
+
+
+def _apply(db: Session, statement, user_id: int):
+    """
+    دستور UPDATE را اجرا و موجودی جدید را برمی‌گرداند؛ در صورت پشتیبانی دیتابیس با RETURNING
+    در همان رفت‌وبرگشت، وگرنه با یک SELECT پس از UPDATE. اگر ردیفی تغییر نکند None برمی‌گرداند.
+    """
+    if db.get_bind().dialect.update_returning:
+        return db.execute(statement.returning(Wallet.points)).scalar()
+    if db.execute(statement).rowcount == 0:
+        return None
+    return db.query(Wallet.points).filter(Wallet.user_id == user_id).scalar()
+
+
+def credit(db: Session, user_id: int, amount: float, reason: str, booking_id: int = None) -> float:
+    """
+    امتیاز را با یک upsert (ایجاد کیف پول یا points = points + x) اضافه و در دفتر ثبت می‌کند.
+    commit بر عهده فراخواننده است تا تغییر همراه با بقیه تراکنش اعمال شود.
+    """
+    now = datetime.utcnow()
+    # ایجاد یا افزایش کیف پول در یک دستور
+    statement = upsert_statement(
+        db, Wallet, {"user_id": user_id, "points": amount, "last_updated": now}, [Wallet.user_id],
+        lambda new: {"points": Wallet.points + new.points, "last_updated": new.last_updated}
+    )
+    if statement is not None:
+        if db.get_bind().dialect.insert_returning and not isinstance(statement, mysql.Insert):
+            balance = db.execute(statement.returning(Wallet.points)).scalar()
+        else:
+            db.execute(statement)
+            balance = db.query(Wallet.points).filter(Wallet.user_id == user_id).scalar()
+        _record(db, user_id, amount, reason, booking_id)
+        return balance
+
+    statement = update(Wallet).where(Wallet.user_id == user_id).values(
+        points=Wallet.points + amount, last_updated=now
+    )
+    # اولین تراکنش کاربر کیف پول را می‌سازد
+    balance = update_or_insert(
+        db, lambda: _apply(db, statement, user_id),
+        insert(Wallet).values(user_id=user_id, points=amount, last_updated=now), inserted=amount
+    )
+    _record(db, user_id, amount, reason, booking_id)
+    return balance
+
+
+def debit(db: Session, user_id: int, amount: float, reason: str) -> float:
+    """
+    امتیاز را فقط در صورت کافی بودن موجودی کم می‌کند:
+    UPDATE wallet SET points = points - x WHERE user_id = u AND points >= x
+    بررسی و کاهش در یک دستور انجام می‌شود و درخواست‌های همزمان موجودی را منفی نمی‌کنند.
+    """
+    statement = update(Wallet).where(Wallet.user_id == user_id).where(Wallet.points >= amount).values(
+        points=Wallet.points - amount, last_updated=datetime.utcnow()
+    )
+    balance = _apply(db, statement, user_id)
+    if balance is None:
+        raise HTTPException(status_code=400, detail="Insufficient points")
+    _record(db, user_id, -amount, reason)
+    return balance
+
+
+def snapshot(bind=engine) -> int:
+    """موجودی همه کیف پول‌ها را همراه با آخرین شناسه دفتر در wallet_snapshots ثبت می‌کند."""
+    with bind.begin() as conn:
+        return conn.execute(text(SNAPSHOT_SQL), {"now": datetime.utcnow()}).rowcount
+
+
+def drifted_wallets(bind=engine) -> list:
+    """کیف پول‌هایی که موجودی آن‌ها با snapshot و دفتر تراکنش‌ها همخوانی ندارد."""
+    with bind.connect() as conn:
+        rows = conn.execute(text(DRIFT_SQL)).all()
+    return [row for row in rows if abs((row.points or 0) - row.expected) > 1e-6]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot wallet balances or verify them against the ledger")
+    parser.add_argument("command", choices=["snapshot", "verify"])
+    args = parser.parse_args()
+    if args.command == "snapshot":
+        print("Snapshotted %d wallets" % snapshot())
+    else:
+        drifted = drifted_wallets()
+        for row in drifted:
+            print("user %d: wallet=%s ledger=%s" % (row.user_id, row.points, row.expected))
+        print("%d wallets out of sync with the ledger" % len(drifted))
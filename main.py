@@ -1,13 +1,22 @@
 from fastapi import FastAPI
 from fastapi.security import OAuth2PasswordBearer
-from routers import users, hotels, bookings, notifications, reviews, discounts, wallets, support_tickets, wishlist
+from routers import users, hotels, bookings, notifications, reviews, discounts, wallets, support_tickets, wishlist, analytics
+from routers import metrics as metrics_router
 from routers import auth_router  # این مسیر را مطابق با پوشه‌ای که روتر در آن است تنظیم کنید
+from booking import hashing
+from booking.config import DB_ASYNC
+from booking.database import ReadYourWritesMiddleware, async_engine, async_read_engine
+from booking.sql_metrics import SQLMetricsMiddleware
+from booking.metrics import MetricsMiddleware
 
 # تعریف مسیر برای توکن
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/token")
 
 # ایجاد اپلیکیشن FastAPI
 app = FastAPI()
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(SQLMetricsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 @app.on_event("startup")
 def configure_openapi():
@@ -26,7 +35,23 @@ def configure_openapi():
             }
         }
 
+@app.on_event("shutdown")
+def shutdown_hash_pool():
+    # بستن استخر پروسه‌های هش پسورد
+    hashing.shutdown()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    if async_read_engine is not None and async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+
 # اضافه کردن روت‌ها
+# در حالت async مسیرهای خواندنی هتل‌ها باید قبل از روتر sync ثبت شوند
+if DB_ASYNC:
+    from routers import async_hotels
+    app.include_router(async_hotels.router)
 app.include_router(users.router)
 app.include_router(hotels.router)
 app.include_router(bookings.router)
@@ -36,4 +61,6 @@ app.include_router(discounts.router)
 app.include_router(wallets.router)
 app.include_router(support_tickets.router)
 app.include_router(wishlist.router)
-app.include_router(auth_router.router)
\ No newline at end of file
+app.include_router(analytics.router)
+app.include_router(auth_router.router)
+app.include_router(metrics_router.router)
\ No newline at end of file
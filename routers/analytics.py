@@ -0,0 +1,101 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from booking.database import get_read_db
+from booking.models import Hotel, HotelDailyStats, User
+from booking.auth import get_current_user
+from booking.rollups import ROLLUP_FIELDS
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Optional
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"]
+)
+
+# حداکثر طول بازه گزارش (روز)
+MAX_RANGE_DAYS = 731
+
+
+class OccupancyDay(BaseModel):
+    day: date
+    nights_booked: int
+    confirmed_nights: int
+    cancelled_nights: int
+    revenue: float
+    discount: float
+
+
+class HotelOccupancy(BaseModel):
+    hotel_id: int
+    nights_available: int
+    nights_booked: int
+    occupancy_rate: float  # nights_booked / nights_available
+    confirmed_nights: int
+    cancelled_nights: int
+    revenue: float
+    discount: float
+    net_revenue: float
+    days: List[OccupancyDay] = []
+
+
+def _occupancy(hotel_id: int, totals, nights_available: int) -> HotelOccupancy:
+    values = dict(zip(ROLLUP_FIELDS, totals or (0,) * len(ROLLUP_FIELDS)))
+    return HotelOccupancy(
+        hotel_id=hotel_id,
+        nights_available=nights_available,
+        occupancy_rate=round(values["nights_booked"] / nights_available, 4),
+        net_revenue=values["revenue"] - values["discount"],
+        **values
+    )
+
+# API برای گزارش اشغال و درآمد هتل‌ها در یک بازه تاریخ (از روی خلاصه‌های روزانه، بدون اسکن رزروها)
+# ادمین همه هتل‌ها و هتل منیجر فقط هتل‌های خود را می‌بیند؛ هر هتل یک واحد قابل رزرو در هر شب است
+@router.get("/occupancy", response_model=List[HotelOccupancy])
+def get_occupancy(
+    start_date: date = Query(..., description="First night of the range"),
+    end_date: date = Query(..., description="Day after the last night of the range"),
+    hotel_id: Optional[int] = Query(None),
+    days: bool = Query(True, description="Include the per-day breakdown"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role not in ["admin", "hotel_manager"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    if start_date >= end_date:
+        raise HTTPException(status_code=422, detail="start_date must be earlier than end_date")
+    nights_available = (end_date - start_date).days
+    if nights_available > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=422, detail="The range can span at most %d days" % MAX_RANGE_DAYS)
+
+    if hotel_id is not None:
+        hotel = db.query(Hotel.id, Hotel.user_id).filter(Hotel.id == hotel_id).first()
+        if not hotel:
+            raise HTTPException(status_code=404, detail="Hotel not found")
+        if current_user.role == "hotel_manager" and hotel.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Access denied")
+
+    def build_query(*columns):
+        query = db.query(*columns).filter(HotelDailyStats.day >= start_date, HotelDailyStats.day < end_date)
+        if hotel_id is not None:
+            return query.filter(HotelDailyStats.hotel_id == hotel_id)
+        if current_user.role == "hotel_manager":
+            return query.join(Hotel, Hotel.id == HotelDailyStats.hotel_id).filter(Hotel.user_id == current_user.id)
+        return query
+
+    fields = [getattr(HotelDailyStats, field) for field in ROLLUP_FIELDS]
+    totals = build_query(HotelDailyStats.hotel_id, *[func.sum(column) for column in fields]).group_by(
+        HotelDailyStats.hotel_id
+    ).order_by(HotelDailyStats.hotel_id)
+    report = {row[0]: _occupancy(row[0], row[1:], nights_available) for row in totals}
+    if hotel_id is not None and hotel_id not in report:
+        report[hotel_id] = _occupancy(hotel_id, None, nights_available)
+
+    if days:
+        rows = build_query(HotelDailyStats.hotel_id, HotelDailyStats.day, *fields).order_by(
+            HotelDailyStats.hotel_id, HotelDailyStats.day
+        )
+        for row in rows:
+            report[row[0]].days.append(OccupancyDay(**dict(zip(("day",) + ROLLUP_FIELDS, row[1:]))))
+    return list(report.values())
@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+from booking.database import get_async_db
+from booking.models import Hotel
+from booking.schemas import HotelResponse
+from booking.availability import hotel_is_free
+from booking.pagination import PageParams, from_model, stream_ndjson
+from booking.catalog import catalog_page, hotel_catalog, hotel_record
+from booking.batch import batch_ids
+from booking.hotel_index import hotel_index
+from booking.search import hotel_search
+from routers.hotels import BrowseParams, BrowseResponse, hotel_filters
+
+# نسخه async مسیرهای خواندنی هتل‌ها؛ در حالت DB_ASYNC قبل از روتر hotels ثبت می‌شود
+# و درخواست‌های نوشتنی (POST/PUT/DELETE) همچنان به روتر sync می‌رسند
+router = APIRouter(
+    prefix="/hotels",
+    tags=["hotels"]
+)
+
+async def catalog_snapshot(db: AsyncSession):
+    # بررسی نسخه یا بارگذاری کش سرد با session sync زیرین AsyncSession
+    return hotel_catalog.cached() or await db.run_sync(hotel_catalog.snapshot)
+
+# عملیات مشاهده لیست هتل‌ها با قابلیت فیلتر
+@router.get("/", response_model=List[HotelResponse])
+async def get_hotels(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    min_price: Optional[float] = Query(None, description="Minimum price per night"),
+    max_price: Optional[float] = Query(None, description="Maximum price per night"),
+    has_wifi: Optional[bool] = Query(None, description="Filter by Wi-Fi availability"),
+    page: PageParams = Depends(),
+    ids: Optional[list] = Depends(batch_ids)
+):
+    if ids is not None:
+        snapshot = await catalog_snapshot(db)
+        return [hotel for hotel in map(snapshot.get, ids) if hotel is not None]
+    if page.stream:
+        filters = hotel_filters(min_price, max_price, has_wifi)
+        return stream_ndjson(lambda db: db.query(Hotel).filter(*filters), Hotel.id, page, from_model(HotelResponse))
+    snapshot = await catalog_snapshot(db)
+    return catalog_page(snapshot, min_price, max_price, has_wifi, page, response)
+
+# جستجوی هتل‌های خالی در یک بازه زمانی با یک کوئری
+@router.get("/available", response_model=List[HotelResponse])
+async def get_available_hotels(
+    check_in_date: date = Query(..., description="Check-in date"),
+    check_out_date: date = Query(..., description="Check-out date"),
+    db: AsyncSession = Depends(get_async_db),
+    min_price: Optional[float] = Query(None, description="Minimum price per night"),
+    max_price: Optional[float] = Query(None, description="Maximum price per night"),
+    has_wifi: Optional[bool] = Query(None, description="Filter by Wi-Fi availability")
+):
+    if check_in_date >= check_out_date:
+        raise HTTPException(status_code=400, detail="Check-in date must be earlier than check-out date")
+
+    stmt = select(Hotel).where(
+        hotel_is_free(check_in_date, check_out_date),
+        *hotel_filters(min_price, max_price, has_wifi)
+    )
+    return (await db.scalars(stmt)).all()
+
+# صفحه جستجو روی ایندکس برداری
+@router.get("/browse", response_model=BrowseResponse)
+async def browse_hotels(params: BrowseParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    index = hotel_index.cached()
+    if index is None:
+        index = await db.run_sync(hotel_index.get)
+    return params.apply(index)
+
+# جستجوی متنی هتل‌ها
+@router.get("/search", response_model=List[HotelResponse])
+async def search_hotels(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text; each word matches as a prefix"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await db.run_sync(hotel_search.search, q, limit)
+
+# عملیات مشاهده جزئیات یک هتل خاص
+@router.get("/{hotel_id:int}", response_model=HotelResponse)
+async def get_hotel(hotel_id: int, db: AsyncSession = Depends(get_async_db)):
+    hotel = (await catalog_snapshot(db)).get(hotel_id)
+    if hotel:
+        return hotel
+    # هتلی که پروسه دیگری پس از آخرین بررسی نسخه ساخته است
+    db_hotel = await db.get(Hotel, hotel_id)
+    if not db_hotel:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hotel not found")
+    hotel_catalog.upsert(db_hotel)
+    return hotel_record(db_hotel)
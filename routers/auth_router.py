@@ -16,7 +16,9 @@ router = APIRouter()
 
 @router.post("/tokens")
 def login_for_access_token(request: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.username).first()
+    user = db.query(User.id, User.password).filter(User.email == request.username).first()
+    # تراکنش پیش از تایید bcrypt بسته می‌شود تا در طول هش هیچ قفلی نگه داشته نشود
+    db.rollback()
     if not user or not verify_password(request.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
     access_token = create_access_token(data={"sub": user.id})
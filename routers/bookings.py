@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import date, datetime
-from booking.database import get_db
-from booking.models import Booking, Hotel, User, Wallet
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+from datetime import date
+import json
+from booking.database import get_db, get_write_db, read_session_factory
+from booking.models import Booking, Hotel, User
 from booking.auth import get_current_user
-from pydantic import BaseModel
+from booking.availability import availability_engine, load_interval_indexes
+from booking.config import BULK_BOOKING_MAX_ROWS, BULK_INSERT_CHUNK_SIZE
+from booking.wallet_ledger import BOOKING_BONUS, credit
+from booking.pagination import PageParams, paginate
+from booking.batch import batch_ids, in_request_order
+from booking.export import EXPORT_FORMATS, export_statement, stream_export
+from booking.rollups import BookingState, add_deltas, apply_deltas, booking_state, record_change
+from booking.schemas import HotelResponse
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional
 
 router = APIRouter(
@@ -36,22 +46,19 @@ class BookingUpdate(BaseModel):
     status: Optional[str] = None  # امکان تغییر وضعیت رزرو
 
 @router.post("/", response_model=BookingResponse)
-def create_booking(booking: BookingCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_booking(booking: BookingCreate, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     # بررسی اینکه تاریخ چک این از تاریخ چک اوت کوچکتر باشد
     if booking.check_in_date >= booking.check_out_date:
         raise HTTPException(status_code=400, detail="Check-in date must be earlier than check-out date")
 
-    hotel = db.query(Hotel).filter(Hotel.id == booking.hotel_id).first()
+    # قفل ردیف هتل (FOR UPDATE در PostgreSQL و MySQL) رزروهای همزمان یک هتل را پشت سر هم اجرا می‌کند؛
+    # در SQLite تراکنش BEGIN IMMEDIATE همین کار را می‌کند
+    hotel = db.query(Hotel).filter(Hotel.id == booking.hotel_id).with_for_update().first()
     if not hotel:
         raise HTTPException(status_code=404, detail="Hotel not found")
 
-    # بررسی رزرو هم‌پوشان
-    overlap_booking = db.query(Booking).filter(
-        Booking.hotel_id == booking.hotel_id,
-        Booking.check_in_date < booking.check_out_date,
-        Booking.check_out_date > booking.check_in_date
-    ).first()
-    if overlap_booking:
+    # بررسی رزرو هم‌پوشان (رزروهای لغوشده در نظر گرفته نمی‌شوند)
+    if not availability_engine.is_available(db, booking.hotel_id, booking.check_in_date, booking.check_out_date):
         raise HTTPException(status_code=400, detail="Booking dates overlap with an existing booking")
 
     new_booking = Booking(
@@ -59,42 +66,225 @@ def create_booking(booking: BookingCreate, db: Session = Depends(get_db), curren
         hotel_id=booking.hotel_id,
         check_in_date=booking.check_in_date,
         check_out_date=booking.check_out_date,
-        status="Pending"
+        status="Pending",
+        price_per_night=hotel.price_per_night
     )
+    # رزرو و امتیاز هدیه در یک تراکنش و با یک commit ثبت می‌شوند؛
+    # flush شناسه رزرو را با INSERT ... RETURNING می‌گیرد و نیازی به refresh نیست
     db.add(new_booking)
+    db.flush()
+    result = BookingResponse.model_validate(new_booking)
+    record_change(db, after=BookingState(
+        hotel.id, result.check_in_date, result.check_out_date, result.status, hotel.price_per_night, 0
+    ))
+    credit(db, current_user.id, BOOKING_BONUS, "booking_bonus", booking_id=result.id)
     db.commit()
-    db.refresh(new_booking)
+    availability_engine.sync(result.id, result.hotel_id, result.check_in_date, result.check_out_date, result.status)
+    return result
 
-    # اضافه کردن موجودی پس از ایجاد رزرو
-    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
-    if wallet:
-        wallet.points += 10
-        wallet.last_updated = datetime.utcnow()
+# نتیجه هر ردیف ورود دسته‌ای؛ row شماره ردیف در ورودی (از صفر) است
+class BulkRowResult(BaseModel):
+    row: int
+    status: str  # created یا rejected
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkBookingResponse(BaseModel):
+    created: int
+    rejected: int
+    results: List[BulkRowResult]
+
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+async def bulk_rows(request: Request) -> list:
+    """
+    بدنه درخواست را به لیست ردیف‌ها تبدیل می‌کند: آرایه JSON یا NDJSON (یک شیء در هر خط).
+    ردیفی که JSON معتبر نباشد به صورت رشته خطا در لیست می‌ماند تا در نتیجه همان ردیف گزارش شود.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as exc:
+                rows.append("Invalid JSON: %s" % exc)
     else:
-        wallet = Wallet(user_id=current_user.id, points=10)
-        db.add(wallet)
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not rows:
+        raise HTTPException(status_code=422, detail="No bookings to import")
+    if len(rows) > BULK_BOOKING_MAX_ROWS:
+        raise HTTPException(status_code=413, detail="At most %d bookings can be imported at once" % BULK_BOOKING_MAX_ROWS)
+    return rows
+
+
+def _validate_row(row) -> BookingCreate:
+    if isinstance(row, str):
+        raise ValueError(row)
+    try:
+        booking = BookingCreate.model_validate(row)
+    except ValidationError as exc:
+        raise ValueError("; ".join("%s: %s" % (".".join(map(str, error["loc"])), error["msg"]) for error in exc.errors()))
+    if booking.check_in_date >= booking.check_out_date:
+        raise ValueError("Check-in date must be earlier than check-out date")
+    return booking
+
+# API برای ورود دسته‌ای رزروها (همگام‌سازی شبانه همکاران)
+# بدنه: آرایه JSON از BookingCreate یا NDJSON با Content-Type: application/x-ndjson
+@router.post("/bulk", response_model=BulkBookingResponse)
+def import_bookings(rows: list = Depends(bulk_rows), db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
+    results = [None] * len(rows)
+    valid = {}
+    for i, row in enumerate(rows):
+        try:
+            valid[i] = _validate_row(row)
+        except ValueError as exc:
+            results[i] = BulkRowResult(row=i, status="rejected", error=str(exc))
+
+    # وجود هتل‌ها و رزروهای موجود همه هتل‌های دسته، هر کدام با یک کوئری SQL در همین تراکنش
+    # بررسی می‌شوند؛ ردیف هتل‌ها مانند create_booking قفل می‌شود تا تا commit رزرو همزمانی ثبت نشود
+    accepted = []
+    if valid:
+        hotel_ids = {booking.hotel_id for booking in valid.values()}
+        prices = dict(db.query(Hotel.id, Hotel.price_per_night).filter(Hotel.id.in_(hotel_ids)).with_for_update())
+        indexes = load_interval_indexes(
+            db, prices,
+            min(booking.check_in_date for booking in valid.values()),
+            max(booking.check_out_date for booking in valid.values())
+        )
+        for i, booking in valid.items():
+            index = indexes.get(booking.hotel_id)
+            if index is None:
+                results[i] = BulkRowResult(row=i, status="rejected", error="Hotel not found")
+            elif index.count_overlaps(booking.check_in_date, booking.check_out_date):
+                results[i] = BulkRowResult(row=i, status="rejected", error="Booking dates overlap with an existing booking")
+            else:
+                # ردیف‌های پذیرفته‌شده به ایندکس اضافه می‌شوند تا هم‌پوشانی درون خود دسته هم رد شود
+                index.add(-1 - i, booking.check_in_date, booking.check_out_date)
+                accepted.append(i)
+
+    # درج با executemany در دسته‌های BULK_INSERT_CHUNK_SIZE تایی؛ در صورت پشتیبانی شناسه‌ها با RETURNING
+    # و به همان ترتیب پارامترها برگردانده می‌شوند، وگرنه (مثلاً MySQL) هر ردیف جدا درج می‌شود
+    returning = db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order
+    statement = insert(Booking)
+    if returning:
+        statement = statement.returning(Booking.id, sort_by_parameter_order=True)
+    for start in range(0, len(accepted), BULK_INSERT_CHUNK_SIZE):
+        chunk = accepted[start:start + BULK_INSERT_CHUNK_SIZE]
+        params = [
+            {
+                "user_id": current_user.id,
+                "hotel_id": valid[i].hotel_id,
+                "check_in_date": valid[i].check_in_date,
+                "check_out_date": valid[i].check_out_date,
+                "status": "Pending",
+                "price_per_night": prices[valid[i].hotel_id],
+            }
+            for i in chunk
+        ]
+        if returning:
+            ids = db.execute(statement, params).scalars().all()
+        else:
+            ids = [db.execute(insert(Booking).values(values)).inserted_primary_key[0] for values in params]
+        for i, booking_id in zip(chunk, ids):
+            results[i] = BulkRowResult(row=i, status="created", id=booking_id)
+
+    # خلاصه‌های روزانه همه ردیف‌ها با هم جمع و یکجا upsert می‌شوند
+    deltas = {}
+    for i in accepted:
+        booking = valid[i]
+        add_deltas(deltas, BookingState(
+            booking.hotel_id, booking.check_in_date, booking.check_out_date, "Pending", prices[booking.hotel_id], 0
+        ))
+    apply_deltas(db, deltas)
+
+    # امتیاز هدیه کل دسته با یک تراکنش کیف پول ثبت و همه‌چیز با یک commit اعمال می‌شود
+    if accepted:
+        credit(db, current_user.id, BOOKING_BONUS * len(accepted), "bulk_booking_bonus")
     db.commit()
-    db.refresh(wallet)
+    # ایندکس اختیاری درون‌حافظه (فقط فیلتر منفی) برای هتل‌های تغییرکرده دوباره ساخته می‌شود
+    for hotel_id in {valid[i].hotel_id for i in accepted}:
+        availability_engine.invalidate(hotel_id)
+    return BulkBookingResponse(created=len(accepted), rejected=len(rows) - len(accepted), results=results)
+
+def booking_to_dict(booking: Booking) -> dict:
+    return {"id": booking.id, "hotel_id": booking.hotel_id, "check_in_date": booking.check_in_date, "check_out_date": booking.check_out_date, "status": booking.status}
+
+# رزرو به همراه اطلاعات هتل آن (برای expand=hotel)
+def booking_with_hotel(booking: Booking) -> dict:
+    data = booking_to_dict(booking)
+    data["hotel"] = HotelResponse.model_validate(booking.hotel, from_attributes=True).model_dump() if booking.hotel else None
+    return data
 
-    return new_booking
 # API برای مشاهده رزروهای کاربر
 @router.get("/", response_model=List[dict])
-def get_user_bookings(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # ادمین تمام رزروها را می‌بیند
-    if current_user.role == "admin":
-        bookings = db.query(Booking).all()
-    # هتل منیجر فقط رزروهای مربوط به هتل‌های خود را می‌بیند
-    elif current_user.role == "hotel_manager":
-        bookings = db.query(Booking).join(Hotel).filter(Hotel.user_id == current_user.id).all()
-    # کاربر معمولی فقط رزروهای خود را می‌بیند
-    else:
-        bookings = db.query(Booking).filter(Booking.user_id == current_user.id).all()
+def get_user_bookings(
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    page: PageParams = Depends(),
+    ids: Optional[list] = Depends(batch_ids),
+    expand: Optional[str] = Query(None, pattern="^hotel$", description="Set to 'hotel' to embed each booking's hotel")
+):
+    role, user_id = current_user.role, current_user.id
+
+    def build_query(db):
+        query = db.query(Booking)
+        # هتل‌ها با یک کوئری IN جداگانه برای کل صفحه بارگذاری می‌شوند، نه یک کوئری برای هر رزرو
+        if expand:
+            query = query.options(selectinload(Booking.hotel))
+        # ادمین تمام رزروها را می‌بیند
+        if role == "admin":
+            return query
+        # هتل منیجر فقط رزروهای مربوط به هتل‌های خود را می‌بیند
+        if role == "hotel_manager":
+            return query.join(Hotel).filter(Hotel.user_id == user_id)
+        # کاربر معمولی فقط رزروهای خود را می‌بیند
+        return query.filter(Booking.user_id == user_id)
 
-    return [{"id": booking.id, "hotel_id": booking.hotel_id, "check_in_date": booking.check_in_date, "check_out_date": booking.check_out_date, "status": booking.status} for booking in bookings]
+    serialize = booking_with_hotel if expand else booking_to_dict
+    if ids is not None:
+        # دریافت دسته‌ای با یک کوئری IN؛ رزروهای ناموجود یا خارج از دسترسی حذف می‌شوند
+        bookings = build_query(db).filter(Booking.id.in_(ids)).all()
+        return [serialize(booking) for booking in in_request_order(bookings, ids)]
+    bookings = paginate(db, build_query, Booking.id, page, response, serialize)
+    if page.stream:
+        return bookings
+    return [serialize(booking) for booking in bookings]
+
+# API برای خروجی گرفتن از رزروها (همراه با اطلاعات هتل و کاربر) برای گزارش‌گیری
+@router.get("/export")
+def export_bookings(
+    request: Request,
+    fmt: str = Query(
+        "csv", alias="format", pattern="^(%s)$" % "|".join(EXPORT_FORMATS), description="csv, arrow (IPC stream) or parquet"
+    ),
+    start_date: Optional[date] = Query(None, description="Only bookings that end after this date"),
+    end_date: Optional[date] = Query(None, description="Only bookings that start before this date"),
+    hotel_id: Optional[int] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    # ادمین همه رزروها و هتل منیجر فقط رزروهای هتل‌های خود را دریافت می‌کند
+    if current_user.role not in ["admin", "hotel_manager"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    manager_id = current_user.id if current_user.role == "hotel_manager" else None
+    stmt = export_statement(start_date, end_date, [hotel_id] if hotel_id is not None else None, manager_id)
+    return stream_export(stmt, read_session_factory(request), fmt)
 
 # API برای به‌روزرسانی رزرو
 @router.put("/{booking_id}", response_model=dict)
-def update_booking(booking_id: int, booking: BookingUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def update_booking(booking_id: int, booking: BookingUpdate, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     db_booking = db.query(Booking).filter(Booking.id == booking_id).first()
     if not db_booking:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -107,6 +297,7 @@ def update_booking(booking_id: int, booking: BookingUpdate, db: Session = Depend
         if not hotel:
             raise HTTPException(status_code=403, detail="Access denied")
     # ادمین نیازی به بررسی دسترسی خاص ندارد
+    before = booking_state(db, booking_id)
 
     # به‌روزرسانی اطلاعات رزرو
     if booking.check_in_date:
@@ -116,13 +307,17 @@ def update_booking(booking_id: int, booking: BookingUpdate, db: Session = Depend
     if booking.status and current_user.role in ["admin", "hotel_manager"]:
         db_booking.status = booking.status  # تغییر وضعیت رزرو توسط ادمین یا هتل منیجر
 
+    after = before._replace(
+        check_in_date=db_booking.check_in_date, check_out_date=db_booking.check_out_date, status=db_booking.status
+    )
+    record_change(db, before, after)
     db.commit()
-    db.refresh(db_booking)
+    availability_engine.sync(booking_id, after.hotel_id, after.check_in_date, after.check_out_date, after.status)
     return {"message": "Booking updated successfully"}
 
 # API برای لغو رزرو
 @router.delete("/{booking_id}", response_model=dict)
-def cancel_booking(booking_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def cancel_booking(booking_id: int, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     db_booking = db.query(Booking).filter(Booking.id == booking_id).first()
     if not db_booking:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -136,6 +331,10 @@ def cancel_booking(booking_id: int, db: Session = Depends(get_db), current_user:
             raise HTTPException(status_code=403, detail="Access denied")
     # ادمین نیازی به بررسی دسترسی خاص ندارد
 
+    before = booking_state(db, booking_id)
     db_booking.status = "Cancelled"
+    after = before._replace(status=db_booking.status)
+    record_change(db, before, after)
     db.commit()
+    availability_engine.sync(booking_id, after.hotel_id, after.check_in_date, after.check_out_date, after.status)
     return {"message": "Booking cancelled successfully"}
\ No newline at end of file
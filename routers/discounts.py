@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
-from booking.database import get_db
+from booking.database import get_db, get_read_db, get_write_db
 from booking.models import User, Booking, Discount, BookingDiscount
 from booking.auth import get_current_user
+from booking.pagination import PageParams, from_model, paginate
+from booking.rollups import booking_state, record_change
 from pydantic import BaseModel
 from datetime import date
 from typing import List, Optional
@@ -29,7 +31,7 @@ class DiscountResponse(BaseModel):
 
 # API برای ایجاد تخفیف جدید
 @router.post("/", response_model=DiscountResponse)
-def create_discount(discount: DiscountCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_discount(discount: DiscountCreate, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admin can create discounts")
     
@@ -47,13 +49,12 @@ def create_discount(discount: DiscountCreate, db: Session = Depends(get_db), cur
 
 # API برای مشاهده تمام تخفیف‌ها
 @router.get("/", response_model=List[DiscountResponse])
-def get_discounts(db: Session = Depends(get_db)):
-    discounts = db.query(Discount).all()
-    return discounts
+def get_discounts(response: Response, db: Session = Depends(get_read_db), page: PageParams = Depends()):
+    return paginate(db, lambda db: db.query(Discount), Discount.id, page, response, from_model(DiscountResponse))
 
 # API برای اعمال تخفیف به رزرو
 @router.post("/apply/{booking_id}")
-def apply_discount(booking_id: int, discount_code: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def apply_discount(booking_id: int, discount_code: str, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     booking = db.query(Booking).filter(Booking.id == booking_id, Booking.user_id == current_user.id).first()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found or you don't have permission")
@@ -66,10 +67,14 @@ def apply_discount(booking_id: int, discount_code: str, db: Session = Depends(ge
     if discount.valid_from > date.today() or discount.valid_until < date.today():
         raise HTTPException(status_code=400, detail="Discount code is expired or not yet valid")
     
+    before = booking_state(db, booking.id)
     booking_discount = BookingDiscount(
         booking_id=booking.id,
         discount_id=discount.id
     )
     db.add(booking_discount)
+    # درصد تخفیف روی رزرو جمع و مبلغ آن در خلاصه‌های روزانه هتل هم ثبت می‌شود
+    booking.discount_percentage = (booking.discount_percentage or 0) + discount.discount_percentage
+    record_change(db, before, before._replace(discount_percentage=booking.discount_percentage))
     db.commit()
     return {"message": "Discount applied successfully"}
\ No newline at end of file
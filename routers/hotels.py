@@ -1,21 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from booking.database import get_db
+from typing import Dict, List, Optional
+from datetime import date
+from booking.database import get_db, get_read_db, get_write_db
 from booking.models import Hotel, User
 from booking.schemas import HotelCreate, HotelUpdate, HotelResponse
 from booking.auth import get_current_user
+from booking.pagination import PageParams, from_model, paginate
+from booking.catalog import catalog_page, hotel_catalog, hotel_record
+from booking.batch import batch_ids
+from booking.hotel_index import DEFAULT_HISTOGRAM_BINS, SORT_KEYS, hotel_index
+from booking.search import hotel_search
+from booking.availability import availability_engine, available_hotels_query
+from booking.rollups import delete_hotel_rollups
 
 router = APIRouter(
     prefix="/hotels",
     tags=["hotels"]
 )
 
+class PriceBucket(BaseModel):
+    min: float
+    max: float
+    count: int
+
+class WifiFacet(BaseModel):
+    with_wifi: int
+    without_wifi: int
+
+class BrowseFacets(BaseModel):
+    price_histogram: List[PriceBucket]
+    wifi: WifiFacet
+    locations: Dict[str, int]
+
+class BrowseResponse(BaseModel):
+    total: int
+    results: List[HotelResponse]
+    facets: BrowseFacets
+
+# پارامترهای صفحه جستجو که در مسیرهای sync و async مشترک است
+class BrowseParams:
+    def __init__(
+        self,
+        location: Optional[str] = Query(None, description="Exact location"),
+        min_price: Optional[float] = Query(None, description="Minimum price per night"),
+        max_price: Optional[float] = Query(None, description="Maximum price per night"),
+        has_wifi: Optional[bool] = Query(None, description="Filter by Wi-Fi availability"),
+        min_rating: Optional[float] = Query(None, ge=1, le=5, description="Minimum average rating"),
+        sort: str = Query("price_asc", pattern="^(%s)$" % "|".join(SORT_KEYS), description="Result order"),
+        limit: int = Query(20, ge=1, le=100, description="Number of results"),
+        bins: int = Query(DEFAULT_HISTOGRAM_BINS, ge=1, le=50, description="Price histogram buckets")
+    ):
+        self.location = location
+        self.min_price = min_price
+        self.max_price = max_price
+        self.has_wifi = has_wifi
+        self.min_rating = min_rating
+        self.sort = sort
+        self.limit = limit
+        self.bins = bins
+
+    def apply(self, index) -> dict:
+        return index.browse(
+            self.location, self.min_price, self.max_price, self.has_wifi, self.min_rating,
+            self.sort, self.limit, self.bins
+        )
+
 # عملیات ایجاد هتل (فقط برای نقش‌های admin و hotel_manager)
 @router.post("/", response_model=HotelResponse)
 def create_hotel(
     hotel: HotelCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["admin", "hotel_manager"]:
@@ -34,42 +90,92 @@ def create_hotel(
     db.add(new_hotel)
     db.commit()
     db.refresh(new_hotel)
+    hotel_catalog.upsert(new_hotel)
+    hotel_search.upsert(new_hotel)
     return new_hotel
 
+# شرط‌های فیلتر قیمت و وای‌فای که در مسیرهای sync و async مشترک است
+def hotel_filters(min_price: Optional[float], max_price: Optional[float], has_wifi: Optional[bool]) -> list:
+    filters = []
+    if min_price is not None:
+        filters.append(Hotel.price_per_night >= min_price)
+    if max_price is not None:
+        filters.append(Hotel.price_per_night <= max_price)
+    if has_wifi is not None:
+        filters.append(Hotel.has_wifi == has_wifi)
+    return filters
+
 # عملیات مشاهده لیست هتل‌ها با قابلیت فیلتر
 @router.get("/", response_model=List[HotelResponse])
 def get_hotels(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
+    min_price: Optional[float] = Query(None, description="Minimum price per night"),
+    max_price: Optional[float] = Query(None, description="Maximum price per night"),
+    has_wifi: Optional[bool] = Query(None, description="Filter by Wi-Fi availability"),
+    page: PageParams = Depends(),
+    ids: Optional[list] = Depends(batch_ids)
+):
+    if ids is not None:
+        # دریافت دسته‌ای چند هتل به ترتیب درخواست از کش کاتالوگ
+        snapshot = hotel_catalog.snapshot(db)
+        return [hotel for hotel in map(snapshot.get, ids) if hotel is not None]
+    if page.stream:
+        filters = hotel_filters(min_price, max_price, has_wifi)
+        return paginate(db, lambda db: db.query(Hotel).filter(*filters), Hotel.id, page, response, from_model(HotelResponse))
+    # صفحه‌ها از کش کاتالوگ خوانده می‌شوند و فقط در صورت سرد بودن کش به دیتابیس می‌رویم
+    snapshot = hotel_catalog.snapshot(db)
+    return catalog_page(snapshot, min_price, max_price, has_wifi, page, response)
+
+# جستجوی هتل‌های خالی در یک بازه زمانی با یک کوئری
+@router.get("/available", response_model=List[HotelResponse])
+def get_available_hotels(
+    check_in_date: date = Query(..., description="Check-in date"),
+    check_out_date: date = Query(..., description="Check-out date"),
+    db: Session = Depends(get_read_db),
     min_price: Optional[float] = Query(None, description="Minimum price per night"),
     max_price: Optional[float] = Query(None, description="Maximum price per night"),
     has_wifi: Optional[bool] = Query(None, description="Filter by Wi-Fi availability")
 ):
-    query = db.query(Hotel)
+    if check_in_date >= check_out_date:
+        raise HTTPException(status_code=400, detail="Check-in date must be earlier than check-out date")
 
-    if min_price is not None:
-        query = query.filter(Hotel.price_per_night >= min_price)
-    if max_price is not None:
-        query = query.filter(Hotel.price_per_night <= max_price)
-    if has_wifi is not None:
-        query = query.filter(Hotel.has_wifi == has_wifi)
+    query = available_hotels_query(db, check_in_date, check_out_date)
+    return query.filter(*hotel_filters(min_price, max_price, has_wifi)).all()
 
-    hotels = query.all()
-    return hotels
+# صفحه جستجو: نتایج مرتب، تعداد کل و facetها با یک فراخوانی روی ایندکس برداری
+@router.get("/browse", response_model=BrowseResponse)
+def browse_hotels(params: BrowseParams = Depends(), db: Session = Depends(get_read_db)):
+    return params.apply(hotel_index.get(db))
+
+# جستجوی متنی در نام، مکان و توضیحات هتل‌ها به ترتیب رتبه
+@router.get("/search", response_model=List[HotelResponse])
+def search_hotels(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text; each word matches as a prefix"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results"),
+    db: Session = Depends(get_read_db)
+):
+    return hotel_search.search(db, q, limit)
 
 # عملیات مشاهده جزئیات یک هتل خاص
 @router.get("/{hotel_id}", response_model=HotelResponse)
-def get_hotel(hotel_id: int, db: Session = Depends(get_db)):
-    hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
-    if not hotel:
+def get_hotel(hotel_id: int, db: Session = Depends(get_read_db)):
+    hotel = hotel_catalog.snapshot(db).get(hotel_id)
+    if hotel:
+        return hotel
+    # هتلی که پروسه دیگری پس از آخرین بررسی نسخه ساخته است
+    db_hotel = db.get(Hotel, hotel_id)
+    if not db_hotel:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hotel not found")
-    return hotel
+    hotel_catalog.upsert(db_hotel)
+    return hotel_record(db_hotel)
 
 # عملیات به‌روزرسانی اطلاعات هتل (فقط برای نقش‌های admin و hotel_manager)
 @router.put("/{hotel_id}", response_model=HotelResponse)
 def update_hotel(
     hotel_id: int,
     hotel: HotelUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_user)
 ):
     db_hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
@@ -91,25 +197,35 @@ def update_hotel(
 
     db.commit()
     db.refresh(db_hotel)
+    hotel_catalog.upsert(db_hotel)
+    hotel_search.upsert(db_hotel)
     return db_hotel
 
 # عملیات حذف هتل (فقط برای نقش‌های admin)
 @router.delete("/{hotel_id}")
 def delete_hotel(
     hotel_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_user)
 ):
     db_hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
     if not db_hotel:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hotel not found")
     if current_user.role == "admin":
+        delete_hotel_rollups(db, hotel_id)
         db.delete(db_hotel)
         db.commit()
+        availability_engine.invalidate(hotel_id)
+        hotel_catalog.remove(hotel_id)
+        hotel_search.remove(hotel_id)
         return {"message": "Hotel deleted successfully"}
     elif current_user.role == "hotel_manager" and db_hotel.user_id == current_user.id:
+        delete_hotel_rollups(db, hotel_id)
         db.delete(db_hotel)
         db.commit()
+        availability_engine.invalidate(hotel_id)
+        hotel_catalog.remove(hotel_id)
+        hotel_search.remove(hotel_id)
         return {"message": "Hotel deleted successfully"}
     else:
         raise HTTPException(
@@ -117,6 +233,7 @@ def delete_hotel(
             detail="Only admins and the hotel manager who created the hotel can delete it"
         )
 
+    delete_hotel_rollups(db, hotel_id)
     db.delete(db_hotel)
     db.commit()
     return {"message": "Hotel deleted successfully"}
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from booking import metrics
+
+router = APIRouter(
+    tags=["metrics"]
+)
+
+# خروجی متریک‌ها در قالب متنی Prometheus؛ async است تا روی همان thread حلقه رویداد
+# که آمار را به‌روز می‌کند خوانده شود
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
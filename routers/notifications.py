@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from booking.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy.orm import Session, joinedload
+from booking.database import get_db, get_write_db
 from booking.models import Notification, User, Booking
 from booking.auth import get_current_user
+from booking.pagination import PageParams, from_model, paginate
 from pydantic import BaseModel
 from typing import List
 
@@ -27,7 +28,7 @@ class NotificationResponse(BaseModel):
 
 # API برای ایجاد اعلان جدید
 @router.post("/", response_model=dict)
-def create_notification(notification: NotificationCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_notification(notification: NotificationCreate, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     # فقط ادمین یا هتل منیجر مجاز به ایجاد نوتیفیکیشن هستند
     if current_user.role not in ["admin", "hotel_manager"]:
         raise HTTPException(
@@ -36,7 +37,8 @@ def create_notification(notification: NotificationCreate, db: Session = Depends(
         )
 
     # بررسی اینکه آیا بوکینگ وجود دارد
-    booking = db.query(Booking).filter(Booking.id == notification.booking_id).first()
+    # هتل رزرو برای بررسی دسترسی هتل منیجر در همان کوئری بارگذاری می‌شود
+    booking = db.query(Booking).options(joinedload(Booking.hotel)).filter(Booking.id == notification.booking_id).first()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
 
@@ -61,13 +63,16 @@ def create_notification(notification: NotificationCreate, db: Session = Depends(
 
 # API برای مشاهده اعلان‌های کاربر
 @router.get("/", response_model=List[NotificationResponse])
-def get_user_notifications(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    notifications = db.query(Notification).filter(Notification.user_id == current_user.id).all()
-    return notifications
+def get_user_notifications(response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), page: PageParams = Depends()):
+    user_id = current_user.id
+    return paginate(
+        db, lambda db: db.query(Notification).filter(Notification.user_id == user_id),
+        Notification.id, page, response, from_model(NotificationResponse)
+    )
 
 # API برای علامت‌گذاری اعلان به عنوان خوانده شده
 @router.put("/{notification_id}", response_model=dict)
-def mark_notification_as_read(notification_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def mark_notification_as_read(notification_id: int, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     notification = db.query(Notification).filter(Notification.id == notification_id, Notification.user_id == current_user.id).first()
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
@@ -78,7 +83,7 @@ def mark_notification_as_read(notification_id: int, db: Session = Depends(get_db
 
 # API برای حذف اعلان
 @router.delete("/{notification_id}", response_model=dict)
-def delete_notification(notification_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def delete_notification(notification_id: int, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     notification = db.query(Notification).filter(Notification.id == notification_id, Notification.user_id == current_user.id).first()
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from booking.database import get_db
-from booking.models import Review, User, Booking
+from booking.database import get_db, get_read_db, get_write_db
+from booking.models import Review, User, Booking, Hotel
 from booking.auth import get_current_user
+from booking.pagination import PageParams, from_model, paginate
+from booking.catalog import hotel_catalog
+from booking.ratings import apply_review
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
@@ -13,7 +17,7 @@ router = APIRouter(
 
 class ReviewCreate(BaseModel):
     hotel_id: int
-    rating: int
+    rating: int = Field(..., ge=1, le=5)
     comment: Optional[str] = None
 
 class ReviewResponse(BaseModel):
@@ -26,9 +30,15 @@ class ReviewResponse(BaseModel):
     class Config:
         from_attributes = True  # تنظیم برای تبدیل از ORM
 
+# خلاصه امتیاز هتل در کش کاتالوگ و ایندکس جستجو تغییر کرده است
+def refresh_hotel_caches(db: Session, hotel_id: int):
+    hotel = db.get(Hotel, hotel_id)
+    if hotel is not None:
+        hotel_catalog.upsert(hotel)
+
 # API برای افزودن نظر جدید
 @router.post("/", response_model=ReviewResponse)
-def create_review(review: ReviewCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_review(review: ReviewCreate, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     # بررسی اینکه آیا کاربر هتل را بوک کرده است
     booking = db.query(Booking).filter(
         Booking.hotel_id == review.hotel_id,
@@ -58,27 +68,43 @@ def create_review(review: ReviewCreate, db: Session = Depends(get_db), current_u
         comment=review.comment
     )
     db.add(new_review)
-    db.commit()
+    apply_review(db, review.hotel_id, review.rating, 1)
+    try:
+        db.commit()
+    except IntegrityError:
+        # درخواست همزمان دیگری برای همین هتل نظر ثبت کرده است
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You have already reviewed this hotel"
+        )
     db.refresh(new_review)
+    refresh_hotel_caches(db, new_review.hotel_id)
     return new_review
 
 # API برای دریافت نظرات یک هتل
 @router.get("/{hotel_id}", response_model=List[ReviewResponse])
-def get_reviews(hotel_id: int, db: Session = Depends(get_db)):
-    reviews = db.query(Review).filter(Review.hotel_id == hotel_id).all()
-    if not reviews:
+def get_reviews(hotel_id: int, response: Response, db: Session = Depends(get_read_db), page: PageParams = Depends()):
+    reviews = paginate(
+        db, lambda db: db.query(Review).filter(Review.hotel_id == hotel_id),
+        Review.id, page, response, from_model(ReviewResponse)
+    )
+    if not page.stream and not reviews and page.cursor is None:
         raise HTTPException(status_code=404, detail="No reviews found for this hotel")
     return reviews
 
 # API برای حذف نظر
 @router.delete("/{review_id}")
-def delete_review(review_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def delete_review(review_id: int, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     review = db.query(Review).filter(Review.id == review_id, Review.user_id == current_user.id).first()
     if not review:
         raise HTTPException(
             status_code=404,
             detail="Review not found or you don't have permission to delete it"
         )
+    hotel_id = review.hotel_id
+    apply_review(db, hotel_id, review.rating, -1)
     db.delete(review)
     db.commit()
+    refresh_hotel_caches(db, hotel_id)
     return {"message": "Review deleted successfully"}
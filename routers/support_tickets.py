@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
-from booking.database import get_db
+from booking.database import get_db, get_write_db
 from booking.models import SupportTicket, User
 from booking.auth import get_current_user
+from booking.pagination import PageParams, from_model, paginate
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime  # افزودن این خط برای ایمپورت datetime
@@ -26,7 +27,7 @@ class TicketResponse(BaseModel):
 
 # API برای ایجاد تیکت جدید
 @router.post("/", response_model=TicketResponse)
-def create_ticket(ticket: TicketCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_ticket(ticket: TicketCreate, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     new_ticket = SupportTicket(
         user_id=current_user.id,
         subject=ticket.subject,
@@ -39,13 +40,16 @@ def create_ticket(ticket: TicketCreate, db: Session = Depends(get_db), current_u
 
 # API برای مشاهده تیکت‌های کاربر
 @router.get("/", response_model=List[TicketResponse])
-def get_user_tickets(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    tickets = db.query(SupportTicket).filter(SupportTicket.user_id == current_user.id).all()
-    return tickets
+def get_user_tickets(response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), page: PageParams = Depends()):
+    user_id = current_user.id
+    return paginate(
+        db, lambda db: db.query(SupportTicket).filter(SupportTicket.user_id == user_id),
+        SupportTicket.id, page, response, from_model(TicketResponse)
+    )
 
 # API برای به‌روزرسانی وضعیت تیکت (فقط توسط ادمین‌ها)
 @router.put("/{ticket_id}", response_model=TicketResponse)
-def update_ticket_status(ticket_id: int, status: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def update_ticket_status(ticket_id: int, status: str, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     ticket = db.query(SupportTicket).filter(SupportTicket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from booking.database import get_db
+from booking.database import get_db, get_write_db
 from booking.models import User
-from booking.auth import create_access_token, get_password_hash, verify_password, get_current_user
+from booking.auth import create_access_token, get_password_hash, verify_password, get_current_user, principal_cache
+from booking.batch import batch_ids, in_request_order
+from booking.schemas import UserResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import random
 
 router = APIRouter(
@@ -23,8 +25,11 @@ class UserRegister(BaseModel):
     phone_number: Optional[str] = None
 
 # User registration route
-@router.post("/")
-def register_user(user: UserRegister, db: Session = Depends(get_db)):
+@router.post("/", response_model=UserResponse)
+def register_user(user: UserRegister, db: Session = Depends(get_write_db)):
+    # هش کردن پسورد پیش از اولین کوئری، تا قفل نوشتن در طول هش bcrypt نگه داشته نشود
+    hashed_password = get_password_hash(user.password)
+
     # بررسی که آیا کاربر با ایمیل مشابه قبلاً ثبت‌نام کرده است
     db_user = db.query(User).filter(User.email == user.email).first()
     if db_user:
@@ -39,9 +44,6 @@ def register_user(user: UserRegister, db: Session = Depends(get_db)):
         # اگر ادمین وجود ندارد، اولین کاربر به عنوان ادمین ثبت می‌شود
         user_role = "admin"
 
-    # هش کردن پسورد
-    hashed_password = get_password_hash(user.password)
-
     # ایجاد کاربر جدید
     new_user = User(
         name=user.name,
@@ -61,8 +63,19 @@ def register_user(user: UserRegister, db: Session = Depends(get_db)):
     #access_token = create_access_token(data={"sub": new_user.id})
     #return {"message": "User registered successfully", "access_token": access_token, "token_type": "bearer"}
 
+# Batch lookup of several users with one IN query, in request order
+@router.get("/", response_model=List[UserResponse])
+def get_users(ids: list = Depends(batch_ids), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if ids is None:
+        raise HTTPException(status_code=422, detail="ids is required")
+    # کاربر عادی فقط اطلاعات خودش را می‌بیند؛ شناسه‌های دیگر حذف می‌شوند
+    if current_user.role != "admin":
+        ids = [user_id for user_id in ids if user_id == current_user.id]
+    users = db.query(User).filter(User.id.in_(ids)).all() if ids else []
+    return in_request_order(users, ids)
+
 # CRUD operations for user profile, requiring authentication
-@router.get("/{user_id}")
+@router.get("/{user_id}", response_model=UserResponse)
 def get_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if current_user.id != user_id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
@@ -71,30 +84,33 @@ def get_user(user_id: int, db: Session = Depends(get_db), current_user: User = D
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
-@router.put("/{user_id}")
+@router.put("/{user_id}", response_model=UserResponse)
 def update_user(
     user_id: int,
     user: UserRegister,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.id != user_id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
+    # هش پیش از باز شدن تراکنش نوشتن انجام می‌شود
+    hashed_password = get_password_hash(user.password) if user.password else None
     db_user = db.query(User).filter(User.id == user_id).first()
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     db_user.name = user.name or db_user.name
     db_user.lastname = user.lastname or db_user.lastname
     db_user.email = user.email or db_user.email
-    if user.password:
-        db_user.password = get_password_hash(user.password)
+    if hashed_password:
+        db_user.password = hashed_password
     db_user.phone_number = user.phone_number or db_user.phone_number
     db.commit()
     db.refresh(db_user)
+    principal_cache.invalidate(user_id)
     return db_user
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def delete_user(user_id: int, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     if current_user.id != user_id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
     db_user = db.query(User).filter(User.id == user_id).first()
@@ -102,4 +118,5 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_user: User
         raise HTTPException(status_code=404, detail="User not found")
     db.delete(db_user)
     db.commit()
+    principal_cache.invalidate(user_id)
     return {"message": "User deleted successfully"}
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from booking.database import get_db
-from booking.models import Wallet, User
+from booking.database import get_db, get_write_db
+from booking.models import Wallet, WalletLedger, User
 from booking.auth import get_current_user
-from pydantic import BaseModel
-from typing import Optional
+from booking.pagination import PageParams, from_model, paginate
+from booking.wallet_ledger import credit, debit
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
 router = APIRouter(
@@ -16,6 +18,13 @@ class WalletResponse(BaseModel):
     points: float  # تغییر نام balance به points
     last_updated: datetime
 
+class LedgerEntryResponse(BaseModel):
+    id: int
+    amount: float
+    reason: str
+    booking_id: Optional[int] = None
+    created_at: datetime
+
 # API برای مشاهده کیف پول کاربر
 @router.get("/", response_model=WalletResponse)
 def get_wallet(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -24,34 +33,33 @@ def get_wallet(db: Session = Depends(get_db), current_user: User = Depends(get_c
         raise HTTPException(status_code=404, detail="Wallet not found")
     return wallet
 
+# API برای مشاهده تاریخچه تراکنش‌های کیف پول
+@router.get("/ledger", response_model=List[LedgerEntryResponse])
+def get_ledger(response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), page: PageParams = Depends()):
+    user_id = current_user.id
+    return paginate(
+        db, lambda db: db.query(WalletLedger).filter(WalletLedger.user_id == user_id),
+        WalletLedger.id, page, response, from_model(LedgerEntryResponse)
+    )
+
 # API برای افزایش امتیاز
 class AddPointsRequest(BaseModel):
-    amount: float
+    amount: float = Field(..., gt=0)
 
 @router.post("/add_points")
-def add_points(request: AddPointsRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
-    if not wallet:
-        wallet = Wallet(user_id=current_user.id, points=request.amount)  # تغییر balance به points
-        db.add(wallet)
-    else:
-        wallet.points += request.amount  # تغییر balance به points
-    wallet.last_updated = datetime.utcnow()
+def add_points(request: AddPointsRequest, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
+    # افزایش اتمی در SQL به همراه ثبت در دفتر تراکنش‌ها
+    points = credit(db, current_user.id, request.amount, "add_points")
     db.commit()
-    db.refresh(wallet)
-    return {"message": "Points added successfully", "points": wallet.points}  # تغییر balance به points
+    return {"message": "Points added successfully", "points": points}  # تغییر balance به points
 
 # API برای استفاده از امتیاز
 class RedeemPointsRequest(BaseModel):
-    amount: float
+    amount: float = Field(..., gt=0)
 
 @router.post("/redeem_points")
-def redeem_points(request: RedeemPointsRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
-    if not wallet or wallet.points < request.amount:  # تغییر balance به points
-        raise HTTPException(status_code=400, detail="Insufficient points")  # تغییر balance به points
-    wallet.points -= request.amount  # تغییر balance به points
-    wallet.last_updated = datetime.utcnow()
+def redeem_points(request: RedeemPointsRequest, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
+    # بررسی موجودی و کاهش آن در یک دستور UPDATE شرطی انجام می‌شود
+    points = debit(db, current_user.id, request.amount, "redeem_points")
     db.commit()
-    db.refresh(wallet)
-    return {"message": "Points redeemed successfully", "remaining_points": wallet.points}  # تغییر balance به points
\ No newline at end of file
+    return {"message": "Points redeemed successfully", "remaining_points": points}  # تغییر balance به points
\ No newline at end of file
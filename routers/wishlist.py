@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from booking.database import get_db
+from booking.database import get_db, get_write_db
 from booking.models import Wishlist, Hotel, User
 from booking.auth import get_current_user
+from booking.pagination import PageParams, paginate
 from pydantic import BaseModel
 from typing import List
 from datetime import datetime
@@ -20,7 +22,7 @@ class WishlistResponse(BaseModel):
 
 # API برای افزودن هتل به لیست علاقه‌مندی‌ها
 @router.post("/", response_model=dict)
-def add_to_wishlist(hotel_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def add_to_wishlist(hotel_id: int, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     # بررسی وجود هتل
     hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
     if not hotel:
@@ -33,19 +35,33 @@ def add_to_wishlist(hotel_id: int, db: Session = Depends(get_db), current_user:
 
     new_wishlist_item = Wishlist(user_id=current_user.id, hotel_id=hotel_id)
     db.add(new_wishlist_item)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # درخواست همزمان دیگری همین هتل را اضافه کرده است
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Hotel already in wishlist")
     db.refresh(new_wishlist_item)
     return {"message": "Hotel added to wishlist"}
 
+def wishlist_item_to_dict(item: Wishlist) -> dict:
+    return {"id": item.id, "hotel_id": item.hotel_id, "added_at": item.added_at}
+
 # API برای مشاهده لیست علاقه‌مندی‌های کاربر
 @router.get("/", response_model=List[WishlistResponse])
-def get_wishlist(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    wishlist = db.query(Wishlist).filter(Wishlist.user_id == current_user.id).all()
-    return [{"id": item.id, "hotel_id": item.hotel_id, "added_at": item.added_at} for item in wishlist]
+def get_wishlist(response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), page: PageParams = Depends()):
+    user_id = current_user.id
+    wishlist = paginate(
+        db, lambda db: db.query(Wishlist).filter(Wishlist.user_id == user_id),
+        Wishlist.id, page, response, wishlist_item_to_dict
+    )
+    if page.stream:
+        return wishlist
+    return [wishlist_item_to_dict(item) for item in wishlist]
 
 # API برای حذف هتل از لیست علاقه‌مندی‌ها
 @router.delete("/{hotel_id}", response_model=dict)
-def remove_from_wishlist(hotel_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def remove_from_wishlist(hotel_id: int, db: Session = Depends(get_write_db), current_user: User = Depends(get_current_user)):
     wishlist_item = db.query(Wishlist).filter(Wishlist.user_id == current_user.id, Wishlist.hotel_id == hotel_id).first()
     if not wishlist_item:
         raise HTTPException(status_code=404, detail="Hotel not found in wishlist")
@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# دیتابیس موقت باید پیش از import شدن booking.config تنظیم شود
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///%s" % os.path.join(_tmpdir, "hotel_booking.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from booking.create_tables import create_tables
+    import main
+
+    create_tables()
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def register(client, email: str, password: str = "secret") -> dict:
+    """کاربر جدید ثبت می‌کند و هدر Authorization آن را برمی‌گرداند (اولین کاربر ادمین است)."""
+    response = client.post("/users/", json={"name": "n", "lastname": "l", "email": email, "password": password})
+    assert response.status_code == 200, response.text
+    token = client.post("/tokens", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": "Bearer %s" % token}
@@ -0,0 +1,22 @@
+from conftest import register
+
+
+def test_delete_hotel_with_bookings(client):
+    admin = register(client, "admin@example.com")
+    hotel_id = client.post(
+        "/hotels/", json={"name": "Azadi", "location": "Tehran", "price_per_night": 120}, headers=admin
+    ).json()["id"]
+    booking = client.post(
+        "/bookings/", json={"hotel_id": hotel_id, "check_in_date": "2031-03-01", "check_out_date": "2031-03-04"},
+        headers=admin
+    )
+    assert booking.status_code == 200, booking.text
+    occupancy = client.get(
+        "/analytics/occupancy", params={"start_date": "2031-03-01", "end_date": "2031-03-04", "hotel_id": hotel_id},
+        headers=admin
+    ).json()
+    assert occupancy[0]["nights_booked"] == 3
+
+    response = client.delete("/hotels/%d" % hotel_id, headers=admin)
+    assert response.status_code == 200, response.text
+    assert client.get("/hotels/%d" % hotel_id).status_code == 404